@@ -0,0 +1,38 @@
+"""Benchmarks linking dependencies and vulnerabilities in the CycloneDXWriter
+
+Builds synthetic CycloneDX BOMs of increasing size and times write_document.
+With the bom-ref index the time per component should stay roughly constant
+as the number of components grows.
+
+Usage:
+    python benchmarks/cyclonedx_bomref.py [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import time
+
+from generator import generate_cyclonedx
+from nodestream_plugin_sbom.utils.cyclonedx_writer import CycloneDXWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    print(f"{'components':>12} {'seconds':>10} {'us/component':>14}")
+    for size in args.sizes:
+        bom = generate_cyclonedx(
+            size, licenses=0, references=0, vulnerabilities=size // 10
+        )
+        start = time.perf_counter()
+        for _ in CycloneDXWriter(bom).write_document():
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"{size:>12} {elapsed:>10.3f} {elapsed / size * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
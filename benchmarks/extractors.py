@@ -0,0 +1,208 @@
+"""Benchmarks each extractor end to end on generated SBOMs
+
+Generates deterministic CycloneDX and SPDX files, serves them from local stub
+servers for the GitHub, S3 and Amazon Inspector APIs and runs every extractor
+in its own subprocess, so each one starts from a clean interpreter and its
+peak RSS is measured on its own. Prints the records per second, the time to
+the first record and the peak RSS of each extractor. No network access or
+credentials are needed.
+
+Usage:
+    python benchmarks/extractors.py [--files 10] [--components 1000]
+        [--fan-out 3] [--licenses 1] [--references 2] [--vulnerabilities 100]
+        [--spec-version 1.5] [--github-rate-limit 5000]
+        [--extractors sbom sbom-streaming ...]
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from generator import CYCLONEDX_SPEC_VERSIONS, generate, write_documents
+from stubs import aws_stub, github_stub
+
+EXTRACTORS = {
+    "sbom": "nodestream_plugin_sbom.sbom:SBOMExtractor",
+    "sbom-streaming": "nodestream_plugin_sbom.sbom:SBOMExtractor",
+    "sbom-workers": "nodestream_plugin_sbom.sbom:SBOMExtractor",
+    "github": "nodestream_plugin_sbom.github:GithubSBOMExtractor",
+    "inspector": "nodestream_plugin_sbom.amazon_inspector:AmazonInspectorSBOMExtractor",
+}
+BUCKET = "benchmark"
+KEY_PREFIX = "exports/"
+REPORT_ID = "benchmark"
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def peak_rss_mb() -> float:
+    """Gets the peak resident set size of the current process
+
+    Returns:
+        float: The peak RSS in MiB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+async def measure(extractor) -> dict:
+    """Drains the records of an extractor
+
+    Args:
+        extractor (Extractor): The extractor to run
+
+    Returns:
+        dict: The number of records, the seconds to the first record and the
+            total seconds
+    """
+    records = 0
+    first = None
+    start = time.perf_counter()
+    async for _ in extractor.extract_records():
+        if first is None:
+            first = time.perf_counter() - start
+        records += 1
+    return {
+        "records": records,
+        "first_record": first or 0.0,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def child(name: str, arguments: dict):
+    """Runs one extractor and prints its measurements as JSON
+
+    Args:
+        name (str): The name of the extractor in EXTRACTORS
+        arguments (dict): The arguments of the extractor
+    """
+    module, _, cls = EXTRACTORS[name].partition(":")
+    extractor = getattr(importlib.import_module(module), cls)(**arguments)
+    result = asyncio.run(measure(extractor))
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def run_child(name: str, arguments: dict, env: dict) -> dict:
+    """Runs an extractor in a subprocess
+
+    Args:
+        name (str): The name of the extractor in EXTRACTORS
+        arguments (dict): The arguments of the extractor
+        env (dict): The environment of the subprocess
+
+    Returns:
+        dict: The measurements of the extractor
+    """
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", name, "--config", json.dumps(arguments)],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--components", type=int, default=1_000)
+    parser.add_argument("--fan-out", type=int, default=3)
+    parser.add_argument("--licenses", type=int, default=1)
+    parser.add_argument("--references", type=int, default=2)
+    parser.add_argument("--vulnerabilities", type=int, default=100)
+    parser.add_argument(
+        "--spec-version", choices=CYCLONEDX_SPEC_VERSIONS, default="1.5"
+    )
+    parser.add_argument(
+        "--github-rate-limit",
+        type=int,
+        default=5_000,
+        help="requests the GitHub stub allows in its hour, the extractor is "
+        "paced once fewer than 100 are left",
+    )
+    parser.add_argument(
+        "--extractors", nargs="+", choices=EXTRACTORS, default=list(EXTRACTORS)
+    )
+    parser.add_argument("--child", choices=EXTRACTORS, help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, json.loads(args.config))
+        return
+
+    options = {
+        "components": args.components,
+        "fan_out": args.fan_out,
+        "licenses": args.licenses,
+        "references": args.references,
+        "vulnerabilities": args.vulnerabilities,
+        "spec_version": args.spec_version,
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        write_documents(Path(directory), "cyclonedx", args.files, **options)
+        write_documents(Path(directory), "spdx", args.files, **options)
+        prefix = f"{KEY_PREFIX}CYCLONEDX_1_4_outputs_{REPORT_ID}/"
+        objects = {
+            f"{prefix}{seed}/sbom.json": json.dumps(
+                generate("cyclonedx", seed=seed, **options)
+            ).encode("utf-8")
+            for seed in range(args.files)
+        }
+        sboms = {
+            f"benchmark/repo-{seed}": generate("spdx", seed=seed, **options)
+            for seed in range(args.files)
+        }
+
+        with github_stub(sboms, args.github_rate_limit) as github, aws_stub(
+            BUCKET, objects, REPORT_ID
+        ) as aws:
+            configs = {
+                "sbom": {"paths": directory},
+                "sbom-streaming": {"paths": directory, "streaming": True},
+                "sbom-workers": {"paths": directory, "workers": 4},
+                "github": {"repos": sorted(sboms), "api_url": github.url},
+                "inspector": {
+                    "bucketName": BUCKET,
+                    "keyPrefix": KEY_PREFIX,
+                    "kmsKeyArn": "arn:aws:kms:us-east-1:000000000000:key/benchmark",
+                    "s3_endpoint_url": aws.url,
+                },
+            }
+            env = {
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(
+                    filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])
+                ),
+                "AWS_ACCESS_KEY_ID": "benchmark",
+                "AWS_SECRET_ACCESS_KEY": "benchmark",
+                "AWS_DEFAULT_REGION": "us-east-1",
+                "AWS_ENDPOINT_URL_INSPECTOR2": aws.url,
+            }
+
+            print(
+                f"{'extractor':>16} {'records':>10} {'records/s':>12} "
+                f"{'first (ms)':>12} {'seconds':>10} {'peak RSS (MiB)':>16}"
+            )
+            for name in args.extractors:
+                result = run_child(name, configs[name], env)
+                print(
+                    f"{name:>16} {result['records']:>10} "
+                    f"{result['records'] / result['seconds']:>12.0f} "
+                    f"{result['first_record'] * 1e3:>12.1f} "
+                    f"{result['seconds']:>10.3f} {result['peak_rss_mb']:>16.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmarks flattening record attributes against flatdict.FlatterDict
+
+Flattens the attributes of synthetic CycloneDX components with the
+AttributeFlattener and with the flatdict based cleanup it replaced, checks
+that both produce the same keys and values and prints the time per record.
+Requires the flatdict dev dependency.
+
+Usage:
+    python benchmarks/flatten.py [--records 20000] [--max-depth 2]
+"""
+
+import argparse
+import copy
+import time
+
+import flatdict
+
+from nodestream_plugin_sbom.utils.attribute_flattener import AttributeFlattener
+
+
+def build_attributes(i: int) -> dict:
+    """Builds the attributes of a synthetic CycloneDX component
+
+    Args:
+        i (int): The number of the component
+
+    Returns:
+        dict: The attributes
+    """
+    return {
+        "type": "library",
+        "name": f"package-{i}",
+        "version": "1.0.0",
+        "bom-ref": f"pkg:pypi/package-{i}@1.0.0",
+        "purl": f"pkg:pypi/package-{i}@1.0.0",
+        "hashes": [
+            {"alg": "SHA-256", "content": f"{i:064x}"},
+            {"alg": "SHA-1", "content": f"{i:040x}"},
+        ],
+        "supplier": {"name": f"supplier-{i % 100}", "url": [f"https://{i}.example"]},
+        "properties": [
+            {"name": f"aquasecurity:trivy:Property{j}", "value": str(j)}
+            for j in range(8)
+        ],
+        "evidence": {
+            "occurrences": [{"location": f"/usr/lib/{i}/{j}"} for j in range(4)],
+            "identity": {"field": "purl", "confidence": 1},
+        },
+        "__component_id": f"Component_library_package-{i}",
+        "scope": [],
+    }
+
+
+def flatdict_clean(data: dict) -> dict:
+    """The flatdict based cleanup the extractors used before the flattener
+
+    Args:
+        data (dict): The attributes
+
+    Returns:
+        dict: The flattened attributes
+    """
+    for key in list(data):
+        if isinstance(data[key], list) and len(data[key]) == 0:
+            data.pop(key)
+        elif key.startswith("__"):
+            data.pop(key)
+    return dict(flatdict.FlatterDict(data, delimiter=".").items())
+
+
+def run(name: str, flatten, records: list) -> float:
+    start = time.perf_counter()
+    for attributes in records:
+        flatten(attributes)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>24} {elapsed:>10.3f} {elapsed / len(records) * 1e6:>12.2f}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--max-depth", type=int, default=2)
+    args = parser.parse_args()
+
+    records = [build_attributes(i) for i in range(args.records)]
+    assert AttributeFlattener().flatten(copy.deepcopy(records[0])) == flatdict_clean(
+        copy.deepcopy(records[0])
+    )
+
+    print(f"{'implementation':>24} {'seconds':>10} {'us/record':>12}")
+    baseline = run("flatdict.FlatterDict", flatdict_clean, copy.deepcopy(records))
+    for name, flattener in (
+        ("AttributeFlattener", AttributeFlattener()),
+        (f"max_depth={args.max_depth}", AttributeFlattener(max_depth=args.max_depth)),
+        (
+            "flatten_keys=hashes",
+            AttributeFlattener(flatten_keys=["hashes"]),
+        ),
+    ):
+        elapsed = run(name, flattener.flatten, records)
+        print(f"{'':>24} {baseline / elapsed:>10.1f}x faster than flatdict")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Generates deterministic synthetic CycloneDX and SPDX SBOMs for the benchmarks
+
+The same arguments and seed always produce the same documents, so results
+can be compared between changes. CycloneDX documents follow spec versions
+1.4 to 1.6 and SPDX documents follow SPDX 2.3.
+
+Usage:
+    python benchmarks/generator.py DIRECTORY [--format cyclonedx] [--files 10]
+        [--components 1000] [--fan-out 3] [--licenses 1] [--references 2]
+        [--vulnerabilities 100] [--spec-version 1.5]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+CYCLONEDX_SPEC_VERSIONS = ("1.4", "1.5", "1.6")
+FORMATS = ("cyclonedx", "spdx")
+LICENSE_IDS = (
+    "Apache-2.0",
+    "MIT",
+    "BSD-3-Clause",
+    "BSD-2-Clause",
+    "GPL-2.0-only",
+    "GPL-3.0-or-later",
+    "LGPL-2.1-only",
+    "MPL-2.0",
+    "ISC",
+    "EPL-2.0",
+)
+SEVERITIES = ("critical", "high", "medium", "low")
+
+
+def pick_dependencies(rng: random.Random, i: int, size: int, fan_out: int) -> list:
+    """Picks the components a component depends on
+
+    Args:
+        rng (random.Random): The random generator of the document
+        i (int): The number of the component
+        size (int): The number of components in the document
+        fan_out (int): The number of dependencies of each component
+
+    Returns:
+        list: The numbers of the dependencies
+    """
+    if size < 2:
+        return []
+    return sorted(
+        {(i + rng.randrange(1, size)) % size for _ in range(min(fan_out, size - 1))}
+    )
+
+
+def generate_cyclonedx(
+    components: int,
+    fan_out: int = 3,
+    licenses: int = 1,
+    references: int = 2,
+    duplicate_references: int = 0,
+    vulnerabilities: int = 0,
+    spec_version: str = "1.5",
+    seed: int = 0,
+) -> dict:
+    """Generates a CycloneDX BOM
+
+    Args:
+        components (int): The number of components
+        fan_out (int): The number of dependencies of each component
+        licenses (int): The number of licenses of each component
+        references (int): The number of externalReferences of each component
+        duplicate_references (int): The number of externalReferences of each
+            component that repeat an earlier one
+        vulnerabilities (int): The number of vulnerabilities
+        spec_version (str): The CycloneDX spec version, 1.4 to 1.6
+        seed (int): The seed of the document
+
+    Returns:
+        dict: The CycloneDX BOM
+    """
+    if spec_version not in CYCLONEDX_SPEC_VERSIONS:
+        raise ValueError(f"Unsupported CycloneDX spec version {spec_version}")
+    rng = random.Random(seed)
+
+    def license_choice(i: int) -> dict:
+        license = {"id": LICENSE_IDS[(i + rng.randrange(len(LICENSE_IDS))) % 10]}
+        if spec_version == "1.6":
+            license["acknowledgement"] = "declared"
+        return {"license": license}
+
+    bom_refs = [f"pkg:pypi/package-{seed}-{i}@1.{i % 10}.0" for i in range(components)]
+    document_components = []
+    for i in range(components):
+        urls = [
+            f"https://example.com/package-{seed}-{i}/{j}" for j in range(references)
+        ]
+        component = {
+            "type": "library",
+            "name": f"package-{seed}-{i}",
+            "version": f"1.{i % 10}.0",
+            "bom-ref": bom_refs[i],
+            "purl": bom_refs[i],
+            "hashes": [{"alg": "SHA-256", "content": f"{rng.getrandbits(256):064x}"}],
+            "licenses": [license_choice(j) for j in range(licenses)],
+            "externalReferences": [
+                {"type": "website" if j else "vcs", "url": url}
+                for j, url in enumerate(urls + urls[:duplicate_references])
+            ],
+            "properties": [
+                {"name": "benchmark:layer", "value": str(i % 5)},
+                {"name": "benchmark:path", "value": f"/usr/lib/package-{i}"},
+            ],
+        }
+        document_components.append(component)
+
+    if spec_version == "1.4":
+        tools = [{"vendor": "nodestream", "name": "benchmark", "version": "1.0"}]
+    else:
+        tools = {
+            "components": [
+                {"type": "application", "name": "benchmark", "version": "1.0"}
+            ]
+        }
+
+    bom = {
+        "bomFormat": "CycloneDX",
+        "specVersion": spec_version,
+        "serialNumber": f"urn:uuid:00000000-0000-4000-8000-{seed:012d}",
+        "version": 1,
+        "metadata": {
+            "timestamp": "2024-01-01T00:00:00Z",
+            "tools": tools,
+            "component": {
+                "type": "application",
+                "name": f"benchmark-{seed}",
+                "version": "1.0.0",
+                "bom-ref": f"benchmark-{seed}",
+            },
+        },
+        "components": document_components,
+        "dependencies": [
+            {
+                "ref": f"benchmark-{seed}",
+                "dependsOn": bom_refs[: min(components, 10)],
+            }
+        ]
+        + [
+            {
+                "ref": bom_refs[i],
+                "dependsOn": [
+                    bom_refs[d] for d in pick_dependencies(rng, i, components, fan_out)
+                ],
+            }
+            for i in range(components)
+        ],
+    }
+    if vulnerabilities:
+        bom["vulnerabilities"] = [
+            {
+                "id": f"CVE-2024-{seed}{i:05d}",
+                "source": {"name": "NVD", "url": "https://nvd.nist.gov"},
+                "ratings": [
+                    {
+                        "score": round(rng.uniform(1, 10), 1),
+                        "severity": rng.choice(SEVERITIES),
+                        "method": "CVSSv31",
+                    }
+                ],
+                "description": f"A synthetic vulnerability {i} " * 4,
+                "affects": [
+                    {"ref": bom_refs[rng.randrange(components)]}
+                    for _ in range(1 + i % 3)
+                ],
+            }
+            for i in range(vulnerabilities)
+        ]
+    return bom
+
+
+def generate_spdx(
+    packages: int,
+    fan_out: int = 3,
+    licenses: int = 1,
+    references: int = 2,
+    duplicate_references: int = 0,
+    seed: int = 0,
+) -> dict:
+    """Generates an SPDX 2.3 document
+
+    Args:
+        packages (int): The number of packages
+        fan_out (int): The number of DEPENDS_ON relationships of each package
+        licenses (int): The number of licenses in the licenseConcluded
+            expression of each package
+        references (int): The number of externalRefs of each package
+        duplicate_references (int): The number of externalRefs of each package
+            that repeat an earlier one
+        seed (int): The seed of the document
+
+    Returns:
+        dict: The SPDX document
+    """
+    rng = random.Random(seed)
+    document_packages = []
+    for i in range(packages):
+        refs = [
+            {
+                "referenceCategory": "PACKAGE-MANAGER",
+                "referenceType": "purl" if j == 0 else "maven-central",
+                "referenceLocator": f"pkg:maven/org.example/package-{seed}-{i}@1.{j}",
+            }
+            for j in range(references)
+        ]
+        package_licenses = [
+            LICENSE_IDS[(i + rng.randrange(len(LICENSE_IDS))) % 10]
+            for _ in range(licenses)
+        ]
+        document_packages.append(
+            {
+                "SPDXID": f"SPDXRef-Package-{i}",
+                "name": f"package-{seed}-{i}",
+                "versionInfo": f"1.{i % 10}.0",
+                "downloadLocation": "NOASSERTION",
+                "filesAnalyzed": False,
+                "licenseConcluded": " AND ".join(package_licenses) or "NOASSERTION",
+                "licenseDeclared": package_licenses[0] if package_licenses else "NONE",
+                "copyrightText": "NOASSERTION",
+                "externalRefs": refs + refs[:duplicate_references],
+            }
+        )
+
+    relationships = [
+        {
+            "spdxElementId": "SPDXRef-DOCUMENT",
+            "relationshipType": "DESCRIBES",
+            "relatedSpdxElement": "SPDXRef-Package-0",
+        }
+    ] + [
+        {
+            "spdxElementId": f"SPDXRef-Package-{i}",
+            "relationshipType": "DEPENDS_ON",
+            "relatedSpdxElement": f"SPDXRef-Package-{d}",
+        }
+        for i in range(packages)
+        for d in pick_dependencies(rng, i, packages, fan_out)
+    ]
+    return {
+        "spdxVersion": "SPDX-2.3",
+        "dataLicense": "CC0-1.0",
+        "SPDXID": "SPDXRef-DOCUMENT",
+        "name": f"benchmark-{seed}",
+        "documentNamespace": f"https://example.com/spdx/benchmark-{seed}",
+        "creationInfo": {
+            "created": "2024-01-01T00:00:00Z",
+            "creators": ["Tool: benchmark-1.0"],
+        },
+        "packages": document_packages,
+        "relationships": relationships,
+    }
+
+
+def generate(format: str, seed: int = 0, **options) -> dict:
+    """Generates an SBOM in the given format
+
+    Args:
+        format (str): cyclonedx or spdx
+        seed (int): The seed of the document
+        **options: The options of generate_cyclonedx or generate_spdx, with
+            the number of components given as `components`
+
+    Returns:
+        dict: The SBOM
+    """
+    if format == "cyclonedx":
+        return generate_cyclonedx(seed=seed, **options)
+    options.pop("vulnerabilities", None)
+    options.pop("spec_version", None)
+    return generate_spdx(options.pop("components"), seed=seed, **options)
+
+
+def write_documents(directory: Path, format: str, files: int, **options) -> list:
+    """Writes generated SBOMs to a directory, one seed per file
+
+    Args:
+        directory (Path): The directory to write the files to
+        format (str): cyclonedx or spdx
+        files (int): The number of files
+        **options: The options of the generator
+
+    Returns:
+        list: The paths of the files
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for seed in range(files):
+        path = directory / f"{format}-{seed}.json"
+        with open(path, "w") as f:
+            json.dump(generate(format, seed=seed, **options), f)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--format", choices=FORMATS, default="cyclonedx")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--components", type=int, default=1_000)
+    parser.add_argument("--fan-out", type=int, default=3)
+    parser.add_argument("--licenses", type=int, default=1)
+    parser.add_argument("--references", type=int, default=2)
+    parser.add_argument("--vulnerabilities", type=int, default=100)
+    parser.add_argument(
+        "--spec-version", choices=CYCLONEDX_SPEC_VERSIONS, default="1.5"
+    )
+    args = parser.parse_args()
+
+    paths = write_documents(
+        args.directory,
+        args.format,
+        args.files,
+        components=args.components,
+        fan_out=args.fan_out,
+        licenses=args.licenses,
+        references=args.references,
+        vulnerabilities=args.vulnerabilities,
+        spec_version=args.spec_version,
+    )
+    print(f"Wrote {len(paths)} files to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
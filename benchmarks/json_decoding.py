@@ -0,0 +1,78 @@
+"""Benchmarks decoding SBOM files with each installed JSON backend
+
+Generates a CycloneDX and SPDX corpus, then times reading each file as text
+and decoding it with json.loads, as the extractors used to, against
+JSONDecoder.load_file with each JSON library that is installed. Files of at
+least --mmap-mb MiB are memory mapped when the library reads from buffers.
+
+Usage:
+    python benchmarks/json_decoding.py [--files 4] [--components 20000]
+        [--repeat 3] [--mmap-mb 16]
+"""
+
+import argparse
+import importlib
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from generator import write_documents
+
+from nodestream_plugin_sbom.utils import json_decoder
+from nodestream_plugin_sbom.utils.json_decoder import BACKENDS, JSONDecoder
+
+
+def read_text(path: Path):
+    with open(path, "r") as f:
+        return json.loads(f.read())
+
+
+def run(name: str, load, paths: list, repeat: int) -> float:
+    size = sum(p.stat().st_size for p in paths) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            load(path)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>16} {elapsed:>10.3f} {size / elapsed / (1 << 20):>10.1f}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--components", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mmap-mb", type=int, default=16)
+    args = parser.parse_args()
+    json_decoder.MMAP_THRESHOLD = args.mmap_mb * (1 << 20)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for format in ("cyclonedx", "spdx"):
+            paths += write_documents(
+                Path(directory) / format,
+                format,
+                args.files,
+                components=args.components,
+                vulnerabilities=args.components // 10,
+            )
+        size = sum(p.stat().st_size for p in paths) / (1 << 20)
+        print(f"{len(paths)} files, {size:.1f} MiB")
+        print(f"{'backend':>16} {'seconds':>10} {'MiB/s':>10}")
+
+        baseline = run("json (text)", read_text, paths, args.repeat)
+        for backend in BACKENDS:
+            try:
+                importlib.import_module(backend)
+            except ImportError:
+                print(f"{backend:>16} {'not installed':>21}")
+                continue
+            decoder = JSONDecoder(backend)
+            elapsed = run(backend, decoder.load_file, paths, args.repeat)
+            print(f"{'':>16} {baseline / elapsed:>10.1f}x faster than json (text)")
+
+
+if __name__ == "__main__":
+    main()
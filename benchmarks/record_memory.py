@@ -0,0 +1,141 @@
+"""Benchmarks the memory held by the records written from an SBOM
+
+Generates a CycloneDX and an SPDX document and, in a subprocess per format
+and representation, converts the whole document and keeps every record, as
+a worker process does before sending the records of a file back. Compares
+the SBOMRecord objects the writers emit, with interned ids and shared Edge
+objects, against the same records converted with to_dict into the dicts the
+pipeline interpretations read, the shape every record used to be kept in.
+Prints the peak RSS, the memory taken by the records and their pickled size.
+
+Usage:
+    python benchmarks/record_memory.py [--components 50000] [--fan-out 5]
+        [--licenses 2] [--references 3] [--vulnerabilities 5000]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from extractors import ROOT, peak_rss_mb
+from generator import generate
+
+from nodestream_plugin_sbom.utils.cyclonedx_writer import CycloneDXWriter
+from nodestream_plugin_sbom.utils.spdx_writer import SPDXWriter
+
+WRITERS = {"cyclonedx": CycloneDXWriter, "spdx": SPDXWriter}
+REPRESENTATIONS = ("dicts", "records")
+
+
+def child(path: str, format: str, representation: str):
+    """Converts a document keeping every record and prints the measurements
+    as JSON
+
+    Args:
+        path (str): The path of the SBOM file
+        format (str): The format of the SBOM, a key of WRITERS
+        representation (str): dicts or records
+    """
+    with open(path, "rb") as f:
+        bom = json.loads(f.read())
+    loaded = peak_rss_mb()
+    start = time.perf_counter()
+    records = WRITERS[format](bom).write_document()
+    if representation == "dicts":
+        records = [r.to_dict() for r in records]
+    else:
+        records = list(records)
+    seconds = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print(
+        json.dumps(
+            {
+                "records": len(records),
+                "seconds": seconds,
+                "peak_rss_mb": peak,
+                "records_mb": peak - loaded,
+                "pickled_mb": len(pickle.dumps(records, pickle.HIGHEST_PROTOCOL))
+                / (1 << 20),
+            }
+        )
+    )
+
+
+def run_child(path: Path, format: str, representation: str) -> dict:
+    """Runs a conversion in a subprocess
+
+    Args:
+        path (Path): The path of the SBOM file
+        format (str): The format of the SBOM
+        representation (str): dicts or records
+
+    Returns:
+        dict: The measurements of the conversion
+    """
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])
+        ),
+    }
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", str(path), format, representation],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--components", type=int, default=50_000)
+    parser.add_argument("--fan-out", type=int, default=5)
+    parser.add_argument("--licenses", type=int, default=2)
+    parser.add_argument("--references", type=int, default=3)
+    parser.add_argument("--vulnerabilities", type=int, default=5_000)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    options = {
+        "components": args.components,
+        "fan_out": args.fan_out,
+        "licenses": args.licenses,
+        "references": args.references,
+        "vulnerabilities": args.vulnerabilities,
+    }
+    print(
+        f"{'format':>10} {'held as':>8} {'records':>10} {'seconds':>8} "
+        f"{'peak RSS (MiB)':>15} {'records (MiB)':>14} {'pickled (MiB)':>14}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for format in WRITERS:
+            path = Path(directory) / f"{format}.json"
+            with open(path, "w") as f:
+                json.dump(generate(format, **options), f)
+            results = {r: run_child(path, format, r) for r in REPRESENTATIONS}
+            for representation, result in results.items():
+                print(
+                    f"{format:>10} {representation:>8} {result['records']:>10} "
+                    f"{result['seconds']:>8.3f} {result['peak_rss_mb']:>15.1f} "
+                    f"{result['records_mb']:>14.1f} {result['pickled_mb']:>14.1f}"
+                )
+            saved = (
+                1 - results["records"]["records_mb"] / results["dicts"]["records_mb"]
+            )
+            print(f"{'':>10} records take {saved:.0%} less memory than dicts")
+
+
+if __name__ == "__main__":
+    main()
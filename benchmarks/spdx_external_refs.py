@@ -0,0 +1,54 @@
+"""Benchmarks linking SPDX packages with many external references
+
+Builds synthetic SPDX documents whose packages each list many externalRefs,
+some of them repeated, converts them with the SPDXWriter and counts the
+emitted REFERS_TO edges. Each package should be linked once to each distinct
+reference, so the edge count and the time per package stay linear in the
+number of references.
+
+Usage:
+    python benchmarks/spdx_external_refs.py [--packages 1000] [--refs 10 50 200]
+"""
+
+import argparse
+import time
+
+from generator import generate_spdx
+from nodestream_plugin_sbom.utils.spdx_writer import SPDXWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packages", type=int, default=1_000)
+    parser.add_argument("--refs", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    print(
+        f"{'refs/package':>12} {'edges':>10} {'expected':>10} {'seconds':>10} {'us/ref':>10}"
+    )
+    for refs in args.refs:
+        # One in ten references repeats an earlier one of the same package
+        document = generate_spdx(
+            args.packages,
+            fan_out=0,
+            licenses=0,
+            references=refs - refs // 10,
+            duplicate_references=refs // 10,
+        )
+        expected = sum(
+            len({r["referenceLocator"] for r in p["externalRefs"]})
+            for p in document["packages"]
+        )
+        start = time.perf_counter()
+        edges = 0
+        for element in SPDXWriter(document).write_document():
+            edges += len(element.edges.get("references", []))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{refs:>12} {edges:>10} {expected:>10} {elapsed:>10.3f} "
+            f"{elapsed / (args.packages * refs) * 1e6:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
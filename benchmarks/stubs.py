@@ -0,0 +1,195 @@
+"""Local stub servers for the GitHub, S3 and Amazon Inspector APIs
+
+The stubs implement just enough of each API for the extractors to run end
+to end without network access or credentials:
+
+- GitHub: GET /repos/{owner}/{repo}/dependency-graph/sbom, with a primary
+  rate limit that resets an hour after the server is created
+- S3: ListObjectsV2, HeadObject and GetObject, with byte ranges
+- Amazon Inspector: CreateSbomExport and GetSbomExport, which always succeed
+
+Point the extractors at `server.url` with `api_url`, `s3_endpoint_url` and the
+AWS_ENDPOINT_URL_INSPECTOR2 environment variable.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+from xml.sax.saxutils import escape
+
+
+class StubServer:
+    """Runs a request handler on a local port in a background thread"""
+
+    def __init__(self, handler: type, **state) -> None:
+        """Creates the server
+
+        Args:
+            handler (type): The BaseHTTPRequestHandler of the stub
+            **state: Attributes of the server, read by the handler
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        for name, value in state.items():
+            setattr(self.server, name, value)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def send(self, status: int, body: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GithubHandler(StubHandler):
+    def do_GET(self):
+        match = re.fullmatch(
+            r"/repos/([^/]+/[^/]+)/dependency-graph/sbom", urlparse(self.path).path
+        )
+        with self.server.lock:
+            remaining = self.server.remaining = max(self.server.remaining - 1, -1)
+        rate_limit = {
+            "X-RateLimit-Limit": str(self.server.rate_limit),
+            "X-RateLimit-Remaining": str(max(remaining, 0)),
+            "X-RateLimit-Reset": str(self.server.reset),
+        }
+        if remaining < 0:
+            self.send(403, b'{"message": "API rate limit exceeded"}', rate_limit)
+            return
+        sbom = self.server.sboms.get(match.group(1)) if match else None
+        if sbom is None:
+            self.send(404, b'{"message": "Not Found"}', rate_limit)
+            return
+        body = json.dumps({"sbom": sbom}).encode("utf-8")
+        self.send(
+            200,
+            body,
+            {
+                "Content-Type": "application/json",
+                "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+                **rate_limit,
+            },
+        )
+
+
+class AWSHandler(StubHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = urlparse(self.path).path
+        if path == "/sbomexport/create":
+            body = {"reportId": self.server.report_id}
+        elif path == "/sbomexport/get":
+            body = {"reportId": self.server.report_id, "status": "SUCCEEDED"}
+        else:
+            self.send(404)
+            return
+        self.send(200, json.dumps(body).encode("utf-8"))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        if bucket != self.server.bucket:
+            self.send(404)
+        elif not key:
+            self.__list_objects(parse_qs(url.query).get("prefix", [""])[0])
+        elif key in self.server.objects:
+            self.__get_object(self.server.objects[key])
+        else:
+            self.send(404)
+
+    def __list_objects(self, prefix: str):
+        contents = "".join(
+            f"<Contents><Key>{escape(quote(key))}</Key>"
+            f"<ETag>&quot;{hashlib.md5(body).hexdigest()}&quot;</ETag>"
+            f"<Size>{len(body)}</Size></Contents>"
+            for key, body in sorted(self.server.objects.items())
+            if key.startswith(prefix)
+        )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{self.server.bucket}</Name><Prefix>{escape(prefix)}</Prefix>"
+            "<EncodingType>url</EncodingType><IsTruncated>false</IsTruncated>"
+            f"{contents}</ListBucketResult>"
+        )
+        self.send(200, body.encode("utf-8"), {"Content-Type": "application/xml"})
+
+    def __get_object(self, body: bytes):
+        headers = {
+            "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+            "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+            "Content-Type": "application/json",
+            "Accept-Ranges": "bytes",
+        }
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match is None:
+            self.send(200, body, headers)
+            return
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else len(body) - 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+        self.send(206, body[start : end + 1], headers)
+
+
+def github_stub(sboms: dict, rate_limit: int = 5000) -> StubServer:
+    """Creates a GitHub API stub
+
+    Args:
+        sboms (dict): The SPDX SBOM of each owner/repo name
+        rate_limit (int): The requests allowed until the rate limit resets.
+            Defaults to 5000, GitHub's limit for an authenticated user.
+
+    Returns:
+        StubServer: The server, started when entered as a context manager
+    """
+    return StubServer(
+        GithubHandler,
+        sboms=sboms,
+        rate_limit=rate_limit,
+        remaining=rate_limit,
+        reset=int(time.time()) + 3600,
+        lock=threading.Lock(),
+    )
+
+
+def aws_stub(bucket: str, objects: dict, report_id: str = "benchmark") -> StubServer:
+    """Creates an S3 and Amazon Inspector API stub
+
+    Args:
+        bucket (str): The name of the bucket
+        objects (dict): The body of each key in the bucket
+        report_id (str): The id of the SBOM export
+
+    Returns:
+        StubServer: The server, started when entered as a context manager
+    """
+    return StubServer(AWSHandler, bucket=bucket, objects=objects, report_id=report_id)
@@ -1,10 +1,12 @@
 from .sbom import SBOMExtractor
 from .github import GithubSBOMExtractor
 from .amazon_inspector import AmazonInspectorSBOMExtractor
+from .interpreting import SBOMInterpreter
 from .plugin import SBOMPlugin
 
 __all__ = (
     "SBOMPlugin",
+    "SBOMInterpreter",
     "SBOMExtractor",
     "GithubSBOMExtractor",
     "AmazonInspectorSBOMExtractor",
@@ -1,27 +1,99 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from nodestream.pipeline import Extractor
 import os
-from typing import Any
+from itertools import islice
+from typing import Any, Iterator, Tuple, Union
 from nodestream_plugin_sbom.utils.cyclonedx_writer import CycloneDXWriter
+from nodestream_plugin_sbom.utils.attribute_flattener import AttributeFlattener
+from nodestream_plugin_sbom.utils.attribute_projection import AttributeProjection
+from nodestream_plugin_sbom.utils.emitted_node_cache import (
+    DEFAULT_CACHE_SIZE,
+    EmittedNodeCache,
+)
+from nodestream_plugin_sbom.utils.extraction_metrics import ExtractionMetrics
+from nodestream_plugin_sbom.utils.json_decoder import JSONDecoder
+from nodestream_plugin_sbom.utils.sbom_record import SBOMRecord
+from nodestream_plugin_sbom.utils.sbom_sources import is_json_name, open_documents
+from nodestream_plugin_sbom.utils.state_file import StateFile
 import boto3
+import hashlib
 import time
 from botocore.client import Config
 from pathlib import Path
 import json
 import shutil
-import flatdict
+import tempfile
+
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_EXPORT_TIMEOUT = 3600
+INITIAL_POLL_INTERVAL = 5
+MAX_POLL_INTERVAL = 60
+# Keys that change on every export, even if the resource did not
+VOLATILE_KEYS = ("serialNumber",)
+VOLATILE_METADATA_KEYS = ("timestamp",)
 
 
 class AmazonInspectorSBOMExtractor(Extractor):
     bearer_token: str = None
 
-    def __init__(self, bucketName: str, keyPrefix: str, kmsKeyArn: str) -> None:
-        """The function init, which starts the SBOM export
+    def __init__(
+        self,
+        bucketName: str,
+        keyPrefix: str,
+        kmsKeyArn: str,
+        dedup_cache_size: int = None,
+        concurrency: int = None,
+        s3_endpoint_url: str = None,
+        stage_to_disk: bool = False,
+        report_id: str = None,
+        export_timeout: int = None,
+        state_path: str = None,
+        emit_tombstones: bool = False,
+        flatten_max_depth: int = None,
+        flatten_keys: list[str] = None,
+        projection: dict = None,
+    ) -> None:
+        """The function init, the SBOM export is started when records are extracted
 
         Args:
             bucketName (str): The S3 bucket name for export
             keyPrefix (str): The S3 bucket key for export
             kmsKeyArn (str): The KMS key used to encrypt the export
+            dedup_cache_size (int): The number of License and Reference nodes
+                remembered across files so their properties are only sent once.
+                0 disables the cache. Defaults to 10000.
+            concurrency (int): The number of objects downloaded from S3 at the
+                same time. Defaults to 16.
+            s3_endpoint_url (str): The endpoint of the S3 API, used to point the
+                extractor at an S3 compatible store. Defaults to AWS.
+            stage_to_disk (bool): Download the objects into a temporary directory
+                for this run instead of reading them into memory. Defaults to False.
+            report_id (str): The id of an export that was already started, used
+                to resume a restarted job without starting a new export.
+            export_timeout (int): The number of seconds to wait for the export to
+                complete. Defaults to 3600.
+            state_path (str): The path of a file used to remember the SBOM
+                ingested for each resource. When set, SBOMs with unchanged
+                content are not converted. Every export writes each object
+                again, so objects are still downloaded on every run, apart from
+                objects with an unchanged ETag when the same export is resumed
+                with `report_id`. Defaults to no state.
+            emit_tombstones (bool): Emit a Document record marked as deleted for
+                each resource in the state that is missing from the export.
+                Requires `state_path`. Defaults to False.
+            flatten_max_depth (int): The number of levels of nested attributes
+                expanded into dotted properties, deeper values are kept as JSON
+                strings. Defaults to expanding every level.
+            flatten_keys (list[str]): The attributes whose nested values are
+                expanded into dotted properties, the others are kept as JSON
+                strings. Defaults to expanding every attribute.
+            projection (dict): The include, exclude and rename lists of the
+                attributes copied for each node type. Defaults to copying every
+                attribute.
         """
         if bucketName is None:
             raise AttributeError(
@@ -40,16 +112,21 @@ class AmazonInspectorSBOMExtractor(Extractor):
                 "When using the AmazonInspectorSBOMExtractor 'kmsKeyArn' is required and cannot be empty"
             )
         self.kmsKeyArn = kmsKeyArn
+        self.node_cache = EmittedNodeCache(
+            DEFAULT_CACHE_SIZE if dedup_cache_size is None else dedup_cache_size
+        )
+        self.concurrency = concurrency or DEFAULT_CONCURRENCY
+        self.s3_endpoint_url = s3_endpoint_url
+        self.stage_to_disk = bool(stage_to_disk)
+        self.report_id = report_id
+        self.export_timeout = export_timeout or DEFAULT_EXPORT_TIMEOUT
+        self.state = StateFile(state_path) if state_path else None
+        self.emit_tombstones = bool(emit_tombstones)
+        self.flattener = AttributeFlattener(flatten_max_depth, flatten_keys)
+        self.projection = AttributeProjection(projection) if projection else None
+        self.metrics = ExtractionMetrics()
+        self.decoder = JSONDecoder()
         self.logger = logging.getLogger(self.__class__.__name__)
-        report_id = self.start_sbom_export()
-        self.logger.info(f"Report ID: {report_id}")
-        successful = self.check_for_export_complete(report_id)
-        if successful:
-            self.logger.info("SBOM export successful")
-            self.keyPrefix = self.keyPrefix + f"CYCLONEDX_1_4_outputs_{report_id}/"
-            self.download_s3_dir()
-        else:
-            self.logger.error("SBOM export failed")
 
     def start_sbom_export(self) -> str:
         """Starts an SBOM export
@@ -57,7 +134,6 @@ class AmazonInspectorSBOMExtractor(Extractor):
         Returns:
             str: The report_id for the export
         """
-        self.client = boto3.client("inspector2")
         response = self.client.create_sbom_export(
             reportFormat="CYCLONEDX_1_4",
             s3Destination={
@@ -69,8 +145,9 @@ class AmazonInspectorSBOMExtractor(Extractor):
 
         return response["reportId"]
 
-    def check_for_export_complete(self, report_id: str) -> bool:
-        """Checks to see if the specified export is complete
+    async def check_for_export_complete(self, report_id: str) -> bool:
+        """Waits for the specified export to complete, polling at exponentially
+        growing intervals without blocking the event loop
 
         Args:
             report_id (str): The export report id to check
@@ -78,10 +155,14 @@ class AmazonInspectorSBOMExtractor(Extractor):
         Returns:
             bool: True if successful, False if not
         """
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.export_timeout
+        interval = INITIAL_POLL_INTERVAL
         while True:
-            time.sleep(30)
             self.logger.info("Checking for SBOM export completion")
-            response = self.client.get_sbom_export(reportId=report_id)
+            response = await loop.run_in_executor(
+                None, partial(self.client.get_sbom_export, reportId=report_id)
+            )
             self.logger.info(f"Current Status: {response['status']}")
             if not response["status"] == "IN_PROGRESS":
                 if response["status"] == "SUCCEEDED":
@@ -89,78 +170,295 @@ class AmazonInspectorSBOMExtractor(Extractor):
                 else:
                     return False
 
-    def download_s3_dir(self):
-        """This downloads an entire bucket/key and sub keys from S3 to a local /tmp directory"""
-        if os.path.exists("tmp"):
-            shutil.rmtree("tmp")
-
-        s3_client = boto3.client("s3", config=Config(signature_version="s3v4"))
-        keys = []
-        dirs = []
-        next_token = ""
-        base_kwargs = {
-            "Bucket": self.bucketName,
-            "Prefix": self.keyPrefix,
-        }
-        while next_token is not None:
-            kwargs = base_kwargs.copy()
-            if next_token != "":
-                kwargs.update({"ContinuationToken": next_token})
-            results = s3_client.list_objects_v2(**kwargs)
-            contents = results.get("Contents")
-            for i in contents:
-                k = i.get("Key")
-                if k[-1] != "/":
-                    keys.append(k)
-                else:
-                    dirs.append(k)
-            next_token = results.get("NextContinuationToken")
-        for d in dirs:
-            dest_pathname = os.path.join("tmp", d)
-            if not os.path.exists(os.path.dirname(dest_pathname)):
-                os.makedirs(os.path.dirname(dest_pathname))
-        for k in keys:
-            dest_pathname = os.path.join("tmp", k)
-            if not os.path.exists(os.path.dirname(dest_pathname)):
-                os.makedirs(os.path.dirname(dest_pathname))
-            s3_client.download_file(self.bucketName, k, dest_pathname)
-
-    def __clean_dict(self, data: dict) -> dict:
-        d = data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.error(
+                    f"SBOM export {report_id} did not complete within {self.export_timeout} seconds, set 'report_id' to resume it"
+                )
+                return False
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    def create_s3_client(self):
+        """Creates the S3 client, with a connection pool large enough for every
+        concurrent download
+
+        Returns:
+            S3.Client: The client
+        """
+        return boto3.client(
+            "s3",
+            endpoint_url=self.s3_endpoint_url,
+            config=Config(
+                signature_version="s3v4", max_pool_connections=self.concurrency
+            ),
+        )
+
+    def list_s3_objects(self, s3_client, prefix: str) -> list:
+        """Lists the SBOM files under the export bucket/key
+
+        Args:
+            s3_client (S3.Client): The client to list the objects with
+            prefix (str): The key prefix of the export
+
+        Returns:
+            list: The listing entries of the SBOM files, with their Key and ETag
+        """
+        objects = []
+        paginator = s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucketName, Prefix=prefix):
+            for i in page.get("Contents", []):
+                if is_json_name(i.get("Key")):
+                    objects.append(i)
+        return objects
+
+    def read_s3_object(self, s3_client, key: str) -> bytes:
+        """Reads the body of an object from S3 into memory
+
+        Args:
+            s3_client (S3.Client): The client to read the object with
+            key (str): The key of the object
+
+        Returns:
+            bytes: The body of the object
+        """
+        response = s3_client.get_object(Bucket=self.bucketName, Key=key)
+        with response["Body"] as body:
+            return body.read()
+
+    def download_s3_object(self, s3_client, key: str, directory: str) -> Path:
+        """Downloads an object from S3 to a local directory
+
+        Args:
+            s3_client (S3.Client): The client to download the object with
+            key (str): The key of the object
+            directory (str): The directory to download the object into
+
+        Returns:
+            Path: The path of the downloaded file
+        """
+        dest_pathname = os.path.join(directory, key)
+        os.makedirs(os.path.dirname(dest_pathname), exist_ok=True)
+        s3_client.download_file(self.bucketName, key, dest_pathname)
+        return Path(dest_pathname)
+
+    async def fetch_s3_objects(self, s3_client, objects: list):
+        """Fetches the given objects from S3, with up to `concurrency` requests
+        in flight and at most twice that many objects fetched but not yet
+        converted
+
+        Objects are read into memory, or downloaded into a temporary directory
+        for this run when `stage_to_disk` is set.
+
+        Args:
+            s3_client (S3.Client): The client to fetch the objects with
+            objects (list): The listing entries of the objects to fetch
+
+        Yields:
+            tuple: The listing entry and the body or local path of each object
+                as soon as it has been fetched
+        """
+        loop = asyncio.get_running_loop()
+        directory = (
+            tempfile.mkdtemp(prefix="sbom_inspector_") if self.stage_to_disk else None
+        )
+        objects_by_fetch = {}
+        pending = set()
         try:
-            for key in list(data):
-                if isinstance(d[key], list) and len(d[key]) == 0:
-                    d.pop(key)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                self.logger.info(f"Fetching {len(objects)} SBOM files")
+                objects = iter(objects)
+                while True:
+                    for obj in islice(objects, self.concurrency * 2 - len(pending)):
+                        key = obj["Key"]
+                        if directory is None:
+                            fetch = (self.read_s3_object, s3_client, key)
+                        else:
+                            fetch = (self.download_s3_object, s3_client, key, directory)
+                        fetched = loop.run_in_executor(pool, self.__timed, *fetch)
+                        objects_by_fetch[fetched] = obj
+                        pending.add(fetched)
+                    if not pending:
+                        break
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for fetched in done:
+                        seconds, source = fetched.result()
+                        self.metrics.fetch_seconds += seconds
+                        yield objects_by_fetch.pop(fetched), source
+        finally:
+            for fetched in pending:
+                fetched.cancel()
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    @staticmethod
+    def __timed(fetch, *args) -> Tuple[float, Union[bytes, Path]]:
+        """Fetches an object, timing the request
+
+        Args:
+            fetch (Callable): The method that fetches the object
+            *args: The arguments of the method
+
+        Returns:
+            Tuple[float, Union[bytes, Path]]: The seconds spent and the result
+                of the method
+        """
+        start = time.perf_counter()
+        source = fetch(*args)
+        return time.perf_counter() - start, source
+
+    @staticmethod
+    def digest(sbom: dict) -> str:
+        """Hashes the content of an SBOM, ignoring the export metadata
+
+        Args:
+            sbom (dict): The CycloneDX SBOM
+
+        Returns:
+            str: The hex SHA-256 of the SBOM content
+        """
+        content = {k: v for k, v in sbom.items() if k not in VOLATILE_KEYS}
+        if isinstance(content.get("metadata"), dict):
+            content["metadata"] = {
+                k: v
+                for k, v in content["metadata"].items()
+                if k not in VOLATILE_METADATA_KEYS
+            }
+        return hashlib.sha256(
+            json.dumps(content, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def __convert(
+        self, resource: str, etag: str, source: Union[bytes, Path]
+    ) -> Iterator[SBOMRecord]:
+        """Converts an SBOM file into cleaned records, skipping it if the state
+        shows the same content was already ingested for the resource
+
+        Args:
+            resource (str): The key of the SBOM file relative to the export
+            etag (str): The ETag of the SBOM file
+            source (Union[bytes, Path]): The content or local path of the SBOM
+                file, optionally compressed
+
+        Yields:
+            SBOMRecord: The records of the SBOM
+        """
+        if isinstance(source, Path):
+            self.metrics.bytes_read += source.stat().st_size
+        else:
+            self.metrics.bytes_read += len(source)
+        documents = open_documents(source, resource)
+        try:
+            _, document = next(documents)
+            if isinstance(document, Path):
+                record = self.metrics.parse_file(self.decoder, document)
+            else:
+                record = self.metrics.parse(self.decoder, document.read())
+        finally:
+            documents.close()
+        if self.state is not None:
+            entry = {"etag": etag, "digest": self.digest(record)}
+            previous = self.state.entries.get(resource, {})
+            if previous.get("digest") == entry["digest"]:
+                self.logger.debug(f"SBOM for {resource} has the same content, skipping")
+                self.state.entries[resource] = {**previous, **entry}
+                return
+        writer = CycloneDXWriter(record, self.projection)
+        elements = writer.write_document()
+        document_id = None
+        try:
+            for e in elements:
+                if e is not None:
+                    self.logger.debug(e)
+                    if e.type == CycloneDXWriter.NodeLabels.DOCUMENT.value:
+                        document_id = e.id
+                    e = self.node_cache.deduplicate(e)
+                    if e is None:
+                        continue
+                    e.attributes = self.metrics.flatten(self.flattener, e.attributes)
+                    yield e
                 else:
-                    if key.startswith("__"):
-                        d.pop(key)
-            return dict(flatdict.FlatterDict(d, delimiter=".").items())
+                    self.logger.warning("Skipping an empty element")
         except Exception as e:
+            self.metrics.errors += 1
             self.logger.error(e)
-            return d
+            return
+        if self.state is not None:
+            self.state.entries[resource] = {**entry, "document_id": document_id}
+
+    def __write_tombstones(self, resources: set) -> Iterator[dict]:
+        """Removes the resources missing from the export from the state
+
+        Args:
+            resources (set): The resources in the export
+
+        Yields:
+            dict: A Document record marked as deleted for each missing resource,
+                if `emit_tombstones` is set
+        """
+        for resource in set(self.state.entries) - resources:
+            entry = self.state.entries.pop(resource)
+            self.logger.info(f"SBOM for {resource} is no longer exported")
+            if self.emit_tombstones and entry.get("document_id"):
+                yield {
+                    "attributes": {"deleted": True},
+                    "__type": CycloneDXWriter.NodeLabels.DOCUMENT.value,
+                    "__document_id": entry["document_id"],
+                }
 
     async def extract_records(self) -> Any:
-        """This performs the extraction of the records from the local SBOM copy
+        """This performs the SBOM export, or resumes the one in `report_id`, and
+        the extraction of the records, converting each SBOM file as soon as it
+        is fetched while the others are still in flight
 
         Yields:
             dict: Yields the output
         """
-        paths = sorted(Path("tmp").rglob("*.json"))
-        for path in paths:
-            with open(path, "r") as f:
-                self.elements = []
-                str = f.read()
-                record = json.loads(str)
-                writer = CycloneDXWriter(record)
-                elements = writer.write_document()
-            try:
-                for e in elements:
-                    if e is not None:
-                        self.logger.debug(e)
-                        if "attributes" in e:
-                            e["attributes"] = self.__clean_dict(e["attributes"])
-                        yield e
-                    else:
-                        print(e)
-            except Exception as e:
-                self.logger.error(e)
+        loop = asyncio.get_running_loop()
+        self.client = boto3.client("inspector2")
+        if self.report_id is None:
+            self.report_id = await loop.run_in_executor(None, self.start_sbom_export)
+        else:
+            self.logger.info("Resuming SBOM export")
+        self.logger.info(f"Report ID: {self.report_id}")
+
+        if not await self.check_for_export_complete(self.report_id):
+            self.logger.error("SBOM export failed")
+            return
+        self.logger.info("SBOM export successful")
+
+        prefix = self.keyPrefix + f"CYCLONEDX_1_4_outputs_{self.report_id}/"
+        s3_client = self.create_s3_client()
+        objects = await loop.run_in_executor(
+            None, self.list_s3_objects, s3_client, prefix
+        )
+        resources = {obj["Key"][len(prefix) :] for obj in objects}
+        # Only objects of an export that was already read, i.e. one resumed
+        # with report_id, can have the ETag in the state
+        if self.state is not None:
+            changed = [
+                obj
+                for obj in objects
+                if self.state.entries.get(obj["Key"][len(prefix) :], {}).get("etag")
+                != obj.get("ETag")
+            ]
+            self.logger.info(
+                f"Skipping {len(objects) - len(changed)} SBOM files with unchanged ETags"
+            )
+            objects = changed
+
+        try:
+            async for obj, source in self.fetch_s3_objects(s3_client, objects):
+                for e in self.metrics.measure_file(
+                    self.__convert(obj["Key"][len(prefix) :], obj.get("ETag"), source)
+                ):
+                    yield e.to_dict()
+                self.metrics.report()
+            if self.state is not None:
+                for e in self.__write_tombstones(resources):
+                    yield e
+        finally:
+            if self.state is not None:
+                self.state.save()
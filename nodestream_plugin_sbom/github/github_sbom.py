@@ -1,14 +1,71 @@
+import asyncio
 import logging
+from contextlib import aclosing
+from typing import Iterator
 from nodestream.pipeline import Extractor
+from nodestream_plugin_sbom.utils.attribute_flattener import AttributeFlattener
+from nodestream_plugin_sbom.utils.attribute_projection import AttributeProjection
+from nodestream_plugin_sbom.utils.emitted_node_cache import (
+    DEFAULT_CACHE_SIZE,
+    EmittedNodeCache,
+)
+from nodestream_plugin_sbom.utils.extraction_metrics import ExtractionMetrics
+from nodestream_plugin_sbom.utils.json_decoder import JSONDecoder
+from nodestream_plugin_sbom.utils.sbom_record import SBOMRecord
 from nodestream_plugin_sbom.utils.spdx_writer import SPDXWriter
-import flatdict
-import requests
+from .rate_limiter import RateLimitScheduler
+from .sbom_cache import SBOMCache
+import httpx
+import time
+
+GITHUB_API_URL = "https://api.github.com"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 5
 
 
 class GithubSBOMExtractor(Extractor):
     bearer_token: str = None
 
-    def __init__(self, repos: list[str], bearer_token: str = None) -> None:
+    def __init__(
+        self,
+        repos: list[str],
+        bearer_token: str = None,
+        dedup_cache_size: int = None,
+        concurrency: int = None,
+        api_url: str = None,
+        cache_path: str = None,
+        max_retries: int = None,
+        flatten_max_depth: int = None,
+        flatten_keys: list[str] = None,
+        projection: dict = None,
+    ) -> None:
+        """Creates the extractor
+
+        Args:
+            repos (list[str]): The owner/repo names to fetch the SBOMs of
+            bearer_token (str): The token used to authenticate with GitHub
+            dedup_cache_size (int): The number of License and Reference nodes
+                remembered across repos so their properties are only sent once.
+                0 disables the cache. Defaults to 10000.
+            concurrency (int): The number of SBOMs fetched at the same time.
+                Defaults to 8.
+            api_url (str): The base URL of the GitHub API. Defaults to
+                https://api.github.com
+            cache_path (str): The path of a file used to remember the SBOM
+                ingested for each repo. When set, unchanged SBOMs are requested
+                conditionally and skipped. Defaults to no cache.
+            max_retries (int): The number of times a rate limited or failed
+                request is retried. Defaults to 5.
+            flatten_max_depth (int): The number of levels of nested attributes
+                expanded into dotted properties, deeper values are kept as JSON
+                strings. Defaults to expanding every level.
+            flatten_keys (list[str]): The attributes whose nested values are
+                expanded into dotted properties, the others are kept as JSON
+                strings. Defaults to expanding every attribute.
+            projection (dict): The include, exclude and rename lists of the
+                attributes copied for each node type. Defaults to copying every
+                attribute.
+        """
         if repos is None:
             raise AttributeError(
                 "When using the GithubSBOMExtractor 'repos' is required and cannot be empty"
@@ -16,9 +73,29 @@ class GithubSBOMExtractor(Extractor):
         self.repos = repos
         if bearer_token is not None:
             self.bearer_token = bearer_token
+        self.node_cache = EmittedNodeCache(
+            DEFAULT_CACHE_SIZE if dedup_cache_size is None else dedup_cache_size
+        )
+        self.concurrency = concurrency or DEFAULT_CONCURRENCY
+        self.api_url = (api_url or GITHUB_API_URL).rstrip("/")
+        self.cache = SBOMCache(cache_path) if cache_path else None
+        self.scheduler = RateLimitScheduler(
+            burst=self.concurrency,
+            max_retries=DEFAULT_MAX_RETRIES if max_retries is None else max_retries,
+        )
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.flattener = AttributeFlattener(flatten_max_depth, flatten_keys)
+        self.projection = AttributeProjection(projection) if projection else None
+        self.metrics = ExtractionMetrics()
+        self.decoder = JSONDecoder()
 
-    def fetch_sbom_from_github(self, repo: str) -> object:
+    def create_client(self) -> httpx.AsyncClient:
+        """Creates the pooled HTTP client shared by all of the requests, using
+        HTTP/2 when the h2 package is installed
+
+        Returns:
+            httpx.AsyncClient: The client
+        """
         headers = {
             "X-GitHub-Api-Version": "2022-11-28",
             "Accept": "application/vnd.github+json",
@@ -26,13 +103,61 @@ class GithubSBOMExtractor(Extractor):
         if self.bearer_token is not None:
             headers["Authorization"] = f"Bearer {self.bearer_token}"
         try:
-            resp = requests.get(
-                f"https://api.github.com/repos/{repo}/dependency-graph/sbom",
-                headers=headers,
+            import h2  # noqa: F401
+
+            http2 = True
+        except ImportError:
+            http2 = False
+        return httpx.AsyncClient(
+            base_url=self.api_url,
+            headers=headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+            timeout=httpx.Timeout(60.0),
+        )
+
+    async def fetch_sbom_from_github(
+        self, client: httpx.AsyncClient, repo: str
+    ) -> object:
+        """Fetches the SBOM of a repo
+
+        Args:
+            client (httpx.AsyncClient): The client to send the request with
+            repo (str): The owner/repo name
+
+        Returns:
+            object: The SBOM, or None if it has not changed since it was last ingested
+        """
+        headers = self.cache.conditional_headers(repo) if self.cache else {}
+        try:
+            start = time.perf_counter()
+            resp = await self.__get(
+                client, f"/repos/{repo}/dependency-graph/sbom", headers
             )
+            self.metrics.fetch_seconds += time.perf_counter() - start
 
-            if resp.ok:
-                data = resp.json()
+            if resp.status_code == 304:
+                self.logger.info(f"SBOM for repo {repo} is not modified, skipping")
+                return None
+            elif resp.is_success:
+                self.metrics.bytes_read += len(resp.content)
+                data = self.metrics.parse(self.decoder, resp.content)
+                if self.cache is not None:
+                    digest = SBOMCache.digest(data["sbom"])
+                    self.cache.stage(
+                        repo,
+                        resp.headers.get("ETag"),
+                        resp.headers.get("Last-Modified"),
+                        digest,
+                    )
+                    if self.cache.is_unchanged(repo, digest):
+                        self.logger.info(
+                            f"SBOM for repo {repo} has the same content, skipping"
+                        )
+                        return None
                 return data["sbom"]
             else:
                 raise Exception(
@@ -42,33 +167,126 @@ class GithubSBOMExtractor(Extractor):
             self.logger.error(f"Failed to fetch SBOM from GitHub for repo {repo}: {e}")
             raise Exception(f"Failed to fetch SBOM from GitHub for repo {repo}")
 
-    def __clean_dict(self, data: dict) -> dict:
-        d = data
+    async def __get(
+        self, client: httpx.AsyncClient, url: str, headers: dict
+    ) -> httpx.Response:
+        """Sends a GET request paced by the rate limit scheduler, retrying rate
+        limited, server error and connection failures with jittered backoff
+
+        Args:
+            client (httpx.AsyncClient): The client to send the request with
+            url (str): The URL to request
+            headers (dict): The extra headers of the request
+
+        Returns:
+            httpx.Response: The last response received
+        """
+        attempt = 0
+        while True:
+            await self.scheduler.acquire()
+            try:
+                resp = await client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                if attempt >= self.scheduler.max_retries:
+                    raise
+                self.logger.warning(f"Request to {url} failed, retrying: {e}")
+            else:
+                self.scheduler.update(resp.headers)
+                if not self.scheduler.should_retry(resp, attempt):
+                    return resp
+                self.logger.warning(
+                    f"Request to {url} returned {resp.status_code}, retrying"
+                )
+            await self.scheduler.backoff(attempt)
+            attempt += 1
+
+    async def __fetch_sboms(self, client: httpx.AsyncClient):
+        """Fetches the SBOMs with at most `concurrency` requests in flight
+
+        A repo whose SBOM cannot be fetched is counted as a non-fatal error and
+        skipped, so it does not stop the others.
+
+        Yields:
+            tuple: The repo and its SBOM as soon as its request completes
+        """
+        repos = iter(self.repos)
+        repos_by_task = {}
+        pending = set()
         try:
-            for key in list(data):
-                if isinstance(d[key], list) and len(d[key]) == 0:
-                    d.pop(key)
+            while True:
+                for repo in repos:
+                    task = asyncio.create_task(
+                        self.fetch_sbom_from_github(client, repo)
+                    )
+                    repos_by_task[task] = repo
+                    pending.add(task)
+                    if len(pending) >= self.concurrency:
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    repo = repos_by_task.pop(task)
+                    try:
+                        record = task.result()
+                    except Exception:
+                        # Already logged by fetch_sbom_from_github
+                        self.metrics.errors += 1
+                        self.metrics.report()
+                        continue
+                    yield repo, record
+        finally:
+            for task in pending:
+                task.cancel()
+            # Waits for the cancelled requests so their responses are closed
+            # before the client is
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def extract_records(self):
+        try:
+            async with self.create_client() as client, aclosing(
+                self.__fetch_sboms(client)
+            ) as sboms:
+                async for repo, record in sboms:
+                    errors = self.metrics.errors
+                    if record is not None:
+                        for e in self.metrics.measure_file(
+                            self.__write_records(record)
+                        ):
+                            yield e.to_dict()
+                    # A repo whose SBOM failed to convert is fetched again next run
+                    if self.cache is not None and self.metrics.errors == errors:
+                        self.cache.commit(repo)
+                    self.metrics.report()
+        finally:
+            if self.cache is not None:
+                self.cache.save()
+            self.logger.info(f"GitHub request metrics: {self.scheduler.metrics()}")
+
+    def __write_records(self, record: object) -> Iterator[SBOMRecord]:
+        """Converts an SBOM into cleaned records
+
+        Args:
+            record (object): The SPDX SBOM
+
+        Yields:
+            SBOMRecord: The records of the SBOM
+        """
+        writer = SPDXWriter(record, self.projection)
+        elements = writer.write_document()
+        try:
+            for e in elements:
+                if e is not None:
+                    self.logger.debug(e)
+                    e = self.node_cache.deduplicate(e)
+                    if e is None:
+                        continue
+                    e.attributes = self.metrics.flatten(self.flattener, e.attributes)
+                    yield e
                 else:
-                    if key.startswith("__"):
-                        d.pop(key)
-            return dict(flatdict.FlatterDict(d, delimiter=".").items())
+                    self.logger.warning("Skipping an empty element")
         except Exception as e:
+            self.metrics.errors += 1
             self.logger.error(e)
-            return d
-
-    async def extract_records(self):
-        for repo in self.repos:
-            record = self.fetch_sbom_from_github(repo)
-            writer = SPDXWriter(record)
-            elements = writer.write_document()
-            try:
-                for e in elements:
-                    if e is not None:
-                        self.logger.debug(e)
-                        if "attributes" in e:
-                            e["attributes"] = self.__clean_dict(e["attributes"])
-                        yield e
-                    else:
-                        print(e)
-            except Exception as e:
-                self.logger.error(e)
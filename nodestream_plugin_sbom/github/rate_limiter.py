@@ -0,0 +1,241 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+# The length of the primary rate limit window, which bounds how far away a
+# reset can be
+RATE_LIMIT_WINDOW = 3600.0
+# GitHub asks for a wait of at least a minute after a secondary rate limit
+# that gives no Retry-After or X-RateLimit-Remaining
+SECONDARY_LIMIT_DELAY = 60.0
+DEFAULT_RESERVE = 100
+DEFAULT_MAX_WAIT = 60.0
+
+
+class RateLimitScheduler:
+    """A token bucket that paces requests to the GitHub API
+
+    Requests are sent as fast as the burst allows while more than `reserve`
+    requests of the quota reported by X-RateLimit-Remaining are left. Below
+    the reserve the bucket refills at the rate that spreads what is left
+    evenly until X-RateLimit-Reset, and Retry-After, a secondary rate limit or
+    an exhausted quota pauses every request until it is safe to continue.
+    Waiting requests check again at least every `max_wait` seconds, so a
+    response that resets the quota is picked up without sleeping out a stale
+    delay.
+    """
+
+    def __init__(
+        self,
+        burst: int = 1,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        reserve: int = DEFAULT_RESERVE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ) -> None:
+        """Creates the scheduler
+
+        Args:
+            burst (int): The number of requests that can be sent back to back
+            max_retries (int): The number of times a request is retried
+            base_delay (float): The backoff delay of the first retry in seconds
+            max_delay (float): The largest backoff delay in seconds
+            reserve (int): The number of remaining requests below which
+                requests are paced until the reset. Defaults to 100.
+            max_wait (float): The longest a request sleeps before checking
+                again in seconds. Defaults to 60.
+        """
+        self.capacity = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.reserve = reserve
+        self.max_wait = max_wait
+        # The requests left in the window, counting those sent since the last
+        # response, and the time the window resets
+        self.remaining = None
+        self.reset = None
+        self.rate = None
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+        self.started = time.monotonic()
+        self.requests = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self):
+        """Waits until a request can be sent"""
+        while True:
+            delay = self.__take(time.monotonic())
+            if delay is None:
+                return
+            # Nothing is held while sleeping, so the other requests and the
+            # responses updating the quota carry on
+            delay = min(delay, self.max_wait)
+            self.wait_seconds += delay
+            await asyncio.sleep(delay)
+
+    def __take(self, now: float) -> float:
+        """Takes a token if a request can be sent now
+
+        Args:
+            now (float): The monotonic time
+
+        Returns:
+            float: The seconds until a request may be sent, or None if a
+                token was taken
+        """
+        delay = self.paused_until - now
+        if delay > 0:
+            return delay
+        self.__refill(now)
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.requests += 1
+        if self.remaining is not None:
+            self.remaining -= 1
+        return None
+
+    def update(self, headers: httpx.Headers):
+        """Adapts the pace to the rate limit headers of a response
+
+        Args:
+            headers (httpx.Headers): The headers of the response
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            remaining, reset = int(remaining), float(reset)
+            # Responses of the same window can arrive out of order, so the
+            # lowest count wins until the window resets
+            if reset == self.reset and self.remaining is not None:
+                remaining = min(remaining, self.remaining)
+            self.remaining, self.reset = remaining, reset
+            seconds_to_reset = min(max(reset - time.time(), 1.0), RATE_LIMIT_WINDOW)
+            if remaining <= 0:
+                self.pause(seconds_to_reset)
+            else:
+                self.rate = remaining / seconds_to_reset
+
+        retry_after = self.retry_after(headers)
+        if retry_after is not None:
+            self.pause(retry_after)
+
+    def pause(self, seconds: float):
+        """Stops all requests for the given number of seconds
+
+        Args:
+            seconds (float): The number of seconds to pause for
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def should_retry(self, response: httpx.Response, attempt: int) -> bool:
+        """Checks if a failed request should be sent again
+
+        A 403 is only retried when it is caused by a rate limit, not by a
+        missing permission or a disabled dependency graph. A secondary rate
+        limit that gives no Retry-After or X-RateLimit-Remaining pauses every
+        request for a minute before it is retried.
+
+        Args:
+            response (httpx.Response): The response of the request
+            attempt (int): The zero based attempt number of the request
+
+        Returns:
+            bool: True if the request should be retried
+        """
+        if attempt >= self.max_retries:
+            return False
+        if response.status_code == 403:
+            if (
+                response.headers.get("X-RateLimit-Remaining") == "0"
+                or "Retry-After" in response.headers
+            ):
+                return True
+            if self.is_secondary_limit(response):
+                self.pause(SECONDARY_LIMIT_DELAY)
+                return True
+            return False
+        return response.status_code in RETRYABLE_STATUS_CODES
+
+    async def backoff(self, attempt: int):
+        """Waits before a retry, using exponential backoff with full jitter
+
+        Args:
+            attempt (int): The zero based attempt number of the failed request
+        """
+        self.retries += 1
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        self.wait_seconds += delay
+        await asyncio.sleep(delay)
+
+    def metrics(self) -> dict:
+        """Gets the throughput and wait metrics of the scheduler
+
+        Returns:
+            dict: The requests, retries, seconds spent waiting and requests per second
+        """
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "requests_per_second": round(self.requests / elapsed, 3),
+        }
+
+    @staticmethod
+    def is_secondary_limit(response: httpx.Response) -> bool:
+        """Checks if a 403 was caused by a secondary rate limit
+
+        Args:
+            response (httpx.Response): The response of the request
+
+        Returns:
+            bool: True if the message of the response names a secondary rate limit
+        """
+        try:
+            message = response.json().get("message", "")
+        except (ValueError, AttributeError):
+            message = response.text
+        return "secondary rate limit" in message.lower()
+
+    @staticmethod
+    def retry_after(headers: httpx.Headers) -> float:
+        """Parses the Retry-After header, given in seconds or as an HTTP date
+
+        Args:
+            headers (httpx.Headers): The headers of the response
+
+        Returns:
+            float: The number of seconds to wait, or None
+        """
+        value = headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                return None
+
+    def __refill(self, now: float):
+        if self.reset is not None and time.time() >= self.reset:
+            # The window has reset, so the quota is unknown until the next
+            # response rather than paced by the count of the last window
+            self.remaining = self.reset = self.rate = None
+        if self.rate is None or self.remaining is None or self.remaining > self.reserve:
+            self.tokens = float(self.capacity)
+        else:
+            elapsed = now - self.updated
+            self.tokens = min(float(self.capacity), self.tokens + elapsed * self.rate)
+        self.updated = now
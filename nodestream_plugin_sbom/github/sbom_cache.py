@@ -0,0 +1,93 @@
+import hashlib
+import json
+
+from nodestream_plugin_sbom.utils.state_file import StateFile
+
+# Keys that change every time GitHub generates the SBOM, even if nothing in the repo did
+VOLATILE_KEYS = ("creationInfo", "documentNamespace")
+
+
+class SBOMCache(StateFile):
+    """An on-disk cache of the SBOM last ingested for each repo
+
+    For every repo the cache keeps the ETag and Last-Modified validators of the
+    response and a hash of the SBOM content, so later runs can send conditional
+    requests and skip SBOMs that have not changed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Loads the cache
+
+        Args:
+            path (str): The path of the JSON file holding the cache
+        """
+        super().__init__(path)
+        self.staged = {}
+
+    def conditional_headers(self, repo: str) -> dict:
+        """Gets the headers that make the request for a repo conditional
+
+        Args:
+            repo (str): The owner/repo name
+
+        Returns:
+            dict: The If-None-Match and If-Modified-Since headers, if known
+        """
+        entry = self.entries.get(repo, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def digest(sbom: dict) -> str:
+        """Hashes the content of an SBOM, ignoring the generation metadata
+
+        Args:
+            sbom (dict): The SPDX SBOM
+
+        Returns:
+            str: The hex SHA-256 of the SBOM content
+        """
+        content = {k: v for k, v in sbom.items() if k not in VOLATILE_KEYS}
+        return hashlib.sha256(
+            json.dumps(content, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def is_unchanged(self, repo: str, digest: str) -> bool:
+        """Checks if the SBOM content of a repo matches the last ingested one
+
+        Args:
+            repo (str): The owner/repo name
+            digest (str): The digest of the fetched SBOM
+
+        Returns:
+            bool: True if the content is the same as the cached content
+        """
+        return self.entries.get(repo, {}).get("digest") == digest
+
+    def stage(self, repo: str, etag: str, last_modified: str, digest: str):
+        """Records the validators of a fetched SBOM until it has been ingested
+
+        Args:
+            repo (str): The owner/repo name
+            etag (str): The ETag header of the response
+            last_modified (str): The Last-Modified header of the response
+            digest (str): The digest of the SBOM content
+        """
+        self.staged[repo] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "digest": digest,
+        }
+
+    def commit(self, repo: str):
+        """Marks the staged SBOM of a repo as ingested
+
+        Args:
+            repo (str): The owner/repo name
+        """
+        if repo in self.staged:
+            self.entries[repo] = self.staged.pop(repo)
@@ -0,0 +1,3 @@
+from .sbom_interpreter import SBOMInterpreter
+
+__all__ = ("SBOMInterpreter",)
@@ -0,0 +1,44 @@
+from importlib import resources
+
+import yaml
+from nodestream.interpreting import Interpreter
+from nodestream.pipeline.pipeline_file_loader import PipelineFileContents
+
+DEFINITION_FILE = "interpretations.yaml"
+
+
+class SBOMInterpreter(Interpreter):
+    """The interpreter shared by every SBOM pipeline
+
+    Loads the interpretations packaged with the plugin, a switch on the
+    __type of each record with the interpretations of every node type as its
+    cases, so each record only runs the interpretations of its own type.
+    """
+
+    @staticmethod
+    def load_definition() -> dict:
+        """Loads the packaged interpretations
+
+        Returns:
+            dict: The arguments of the interpreter, with the switch under
+                interpretations
+        """
+        with resources.files(__package__).joinpath(DEFINITION_FILE).open("r") as f:
+            return yaml.load(f, Loader=PipelineFileContents.get_loader())
+
+    @classmethod
+    def from_file_data(cls, **kwargs):
+        """Creates the interpreter from the packaged interpretations
+
+        Args:
+            **kwargs: The arguments of a pipeline step, which must be empty as
+                the interpretations are not configurable
+
+        Returns:
+            SBOMInterpreter: The interpreter
+        """
+        if kwargs:
+            raise AttributeError(
+                f"SBOMInterpreter takes no arguments, got {', '.join(kwargs)}"
+            )
+        return super().from_file_data(**cls.load_definition())
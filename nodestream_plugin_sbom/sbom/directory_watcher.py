@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+
+from nodestream_plugin_sbom.utils.sbom_sources import is_sbom_name
+
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_SETTLE_SECONDS = 2.0
+MIN_TICK = 0.1
+
+
+class WatchdogHandler:
+    """Forwards the file system events of a watchdog observer thread to the
+    event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, callback) -> None:
+        self.loop = loop
+        self.callback = callback
+
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        path = getattr(event, "dest_path", "") or event.src_path
+        self.loop.call_soon_threadsafe(self.callback, Path(path))
+
+
+class DirectoryWatcher:
+    """Watches a directory for new and modified SBOM files
+
+    File system events are received through watchdog (inotify, FSEvents or
+    ReadDirectoryChangesW) when it is installed, otherwise the directory is
+    polled every `interval` seconds. A file is only reported once its size
+    and modification time have not changed for `settle_seconds`, so files
+    that are still being written are not read partially.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        interval: float = None,
+        settle_seconds: float = None,
+    ) -> None:
+        """Creates the watcher, taking a snapshot of the files already present
+
+        Args:
+            directory (Path): The directory to watch, including subdirectories
+            interval (float): The seconds between scans when polling. Defaults to 5.
+            settle_seconds (float): The seconds a file must be left unchanged
+                before it is reported. Defaults to 2.
+        """
+        self.directory = Path(directory)
+        self.interval = interval or DEFAULT_POLL_INTERVAL
+        self.settle_seconds = (
+            DEFAULT_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        )
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # The size and modification time of each file last seen or reported
+        self.__snapshot = self.__scan()
+        # The size and modification time of each changed file, and the time
+        # it was last seen to change
+        self.__pending = {}
+        self.__observer = None
+
+    @staticmethod
+    def __stat(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def __scan(self) -> dict:
+        return {
+            p: self.__stat(p) for p in self.directory.rglob("*") if is_sbom_name(p.name)
+        }
+
+    def __mark(self, path: Path):
+        """Marks a file as changed, restarting its settle time
+
+        Args:
+            path (Path): The path of the file
+        """
+        if is_sbom_name(path.name):
+            self.__pending[path] = (None, time.monotonic())
+
+    def __rescan(self):
+        """Marks the files that differ from the snapshot as changed, keeping
+        the settle time of the ones already marked"""
+        for path, stat in self.__scan().items():
+            if stat != self.__snapshot.get(path) and path not in self.__pending:
+                self.__pending[path] = (stat, time.monotonic())
+
+    def start(self):
+        """Starts receiving file system events, if watchdog is installed"""
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            self.logger.info(
+                f"Polling {self.directory} for SBOM files every {self.interval} seconds"
+            )
+            return
+        self.__observer = Observer()
+        self.__observer.schedule(
+            WatchdogHandler(asyncio.get_running_loop(), self.__mark),
+            str(self.directory),
+            recursive=True,
+        )
+        self.__observer.start()
+        self.logger.info(f"Watching {self.directory} for SBOM files")
+
+    def stop(self):
+        """Stops receiving file system events"""
+        if self.__observer is not None:
+            self.__observer.stop()
+            self.__observer.join()
+            self.__observer = None
+
+    def __settle(self) -> list:
+        """Takes the changed files that have not changed for `settle_seconds`
+
+        Returns:
+            list: The paths of the settled files, in path order
+        """
+        now = time.monotonic()
+        settled = []
+        for path, (stat, since) in list(self.__pending.items()):
+            current = self.__stat(path)
+            if current is None:
+                del self.__pending[path]
+                self.__snapshot.pop(path, None)
+            elif current != stat:
+                self.__pending[path] = (current, now)
+            elif now - since >= self.settle_seconds:
+                del self.__pending[path]
+                if current != self.__snapshot.get(path):
+                    self.__snapshot[path] = current
+                    settled.append(path)
+        return sorted(settled)
+
+    async def changes(self) -> AsyncIterator[list]:
+        """Watches the directory until the iteration is stopped
+
+        Yields:
+            list: The paths of new or modified files, in batches of the files
+                that settled at the same time
+        """
+        self.start()
+        try:
+            # Files written since the snapshot was taken, e.g. while the files
+            # already present were converted, raised no event
+            self.__rescan()
+            while True:
+                if self.__observer is None:
+                    await asyncio.sleep(self.interval)
+                    self.__rescan()
+                else:
+                    await asyncio.sleep(max(self.settle_seconds / 2, MIN_TICK))
+                settled = self.__settle()
+                if settled:
+                    yield settled
+        finally:
+            self.stop()
@@ -0,0 +1,147 @@
+import hashlib
+import os
+from functools import partial
+from pathlib import Path
+
+from nodestream_plugin_sbom.utils.state_file import StateFile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileManifest(StateFile):
+    """An on-disk manifest of the SBOM files already ingested
+
+    For every file the manifest keeps its size, modification time, a hash of
+    its content and the ids of the documents it was ingested as, so later runs
+    can skip files that have not changed without opening them, and files with
+    the same content as another file that was already ingested.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Loads the manifest
+
+        Args:
+            path (str): The path of the JSON file holding the manifest
+        """
+        super().__init__(path)
+        self.staged = {}
+        # The file each content hash was ingested from
+        self.__owners = {
+            entry["digest"]: key
+            for key, entry in self.entries.items()
+            if "duplicate_of" not in entry
+        }
+
+    @staticmethod
+    def key(path: Path) -> str:
+        """Gets the manifest key of a file
+
+        Args:
+            path (Path): The path of the file
+
+        Returns:
+            str: The absolute path of the file
+        """
+        return str(Path(path).resolve())
+
+    @staticmethod
+    def digest(path: Path) -> str:
+        """Hashes the content of a file
+
+        Args:
+            path (Path): The path of the file
+
+        Returns:
+            str: The hex SHA-256 of the file content
+        """
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(partial(f.read, CHUNK_SIZE), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def check(self, path: Path) -> bool:
+        """Checks if a file has to be converted, staging its new state until it
+        has been ingested
+
+        Files whose size and modification time match the manifest are skipped
+        without being opened. Otherwise the file is hashed and skipped if its
+        content is the same as the last ingested content of the same path or
+        of another path.
+
+        Args:
+            path (Path): The path of the file
+
+        Returns:
+            bool: True if the file is new or its content has changed
+        """
+        key = self.key(path)
+        stat = os.stat(path)
+        entry = self.entries.get(key, {})
+        if (
+            entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+            and self.__is_current(entry)
+        ):
+            return False
+
+        state = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": self.digest(path),
+        }
+        if entry.get("digest") == state["digest"] and self.__is_current(entry):
+            self.entries[key] = {**entry, **state}
+            return False
+        if self.__owners.get(entry.get("digest")) == key:
+            del self.__owners[entry["digest"]]
+
+        owner = self.__owners.get(state["digest"])
+        if owner is not None and owner != key:
+            self.logger.info(
+                f"The file at path {path} has the same content as {owner}, skipping"
+            )
+            self.entries[key] = {**state, "duplicate_of": owner}
+            return False
+
+        self.__owners[state["digest"]] = key
+        self.staged[key] = state
+        return True
+
+    def __is_current(self, entry: dict) -> bool:
+        """Checks that the file a duplicate was skipped for still holds its content
+
+        Args:
+            entry (dict): The manifest entry of the file
+
+        Returns:
+            bool: False if the entry is a duplicate of a file that has since
+                changed or been removed
+        """
+        owner = entry.get("duplicate_of")
+        return owner is None or self.__owners.get(entry.get("digest")) == owner
+
+    def commit(self, path: Path, document_ids: list):
+        """Marks the staged state of a file as ingested
+
+        Args:
+            path (Path): The path of the file
+            document_ids (list): The ids of the documents the file was ingested
+                as, more than one for an archive
+        """
+        key = self.key(path)
+        if key in self.staged:
+            self.entries[key] = {**self.staged.pop(key), "document_ids": document_ids}
+
+    def prune(self, paths: list):
+        """Removes the files that are no longer found from the manifest
+
+        Args:
+            paths (list): The paths of the files found in this run
+        """
+        keys = {self.key(p) for p in paths}
+        for key in set(self.entries) - keys:
+            self.logger.info(f"The file at path {key} is no longer found")
+            entry = self.entries.pop(key)
+            if self.__owners.get(entry["digest"]) == key:
+                del self.__owners[entry["digest"]]
@@ -1,65 +1,400 @@
+import asyncio
+import codecs
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from nodestream.pipeline import Extractor
-from typing import Iterable
+from itertools import chain, islice
+from typing import BinaryIO, Iterable, Iterator, Tuple, Union
 from pathlib import Path
-import json
+from nodestream_plugin_sbom.utils.attribute_flattener import AttributeFlattener
+from nodestream_plugin_sbom.utils.attribute_projection import AttributeProjection
+from nodestream_plugin_sbom.utils.emitted_node_cache import (
+    DEFAULT_CACHE_SIZE,
+    EmittedNodeCache,
+)
+from nodestream_plugin_sbom.utils.extraction_metrics import ExtractionMetrics
+from nodestream_plugin_sbom.utils.json_decoder import JSONDecoder
+from nodestream_plugin_sbom.utils.json_spill import JSONSpill
+from nodestream_plugin_sbom.utils.json_stream import JSONStreamReader
+from nodestream_plugin_sbom.utils.sbom_record import SBOMRecord
+from nodestream_plugin_sbom.utils.sbom_sources import is_sbom_name, open_documents
 from nodestream_plugin_sbom.utils.spdx_writer import SPDXWriter
 from nodestream_plugin_sbom.utils.cyclonedx_writer import CycloneDXWriter
-import flatdict
+from .directory_watcher import DirectoryWatcher
+from .file_manifest import FileManifest
 
 
 class SBOMExtractor(Extractor):
-    def __init__(self, paths: Iterable[Path]) -> None:
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        streaming: bool = False,
+        workers: int = None,
+        preserve_order: bool = False,
+        dedup_cache_size: int = None,
+        flatten_max_depth: int = None,
+        flatten_keys: list[str] = None,
+        projection: dict = None,
+        manifest_path: str = None,
+        watch: bool = False,
+        watch_interval: float = None,
+        settle_seconds: float = None,
+    ) -> None:
+        """Creates the extractor
+
+        Args:
+            paths (Iterable[Path]): The directory or file with SBOM files to import.
+                Files may be gzip, zstd, bzip2 or xz compressed, or tar or zip
+                archives of SBOM files.
+            streaming (bool): Parse the components, dependencies, vulnerabilities,
+                packages and relationships one item at a time instead of loading
+                each file into memory. Cannot be combined with `workers`.
+                Defaults to False.
+            workers (int): The number of processes used to parse and convert
+                files in parallel. Each worker sends back the records of a whole
+                file at once, so every file is held in memory, and it cannot be
+                combined with `streaming`. Defaults to converting in this process.
+            preserve_order (bool): When using workers, yield the records of each
+                file in path order rather than as soon as they are converted.
+                Defaults to False.
+            dedup_cache_size (int): The number of License and Reference nodes
+                remembered across files so their properties are only sent once.
+                0 disables the cache. Defaults to 10000.
+            flatten_max_depth (int): The number of levels of nested attributes
+                expanded into dotted properties, deeper values are kept as JSON
+                strings. Defaults to expanding every level.
+            flatten_keys (list[str]): The attributes whose nested values are
+                expanded into dotted properties, the others are kept as JSON
+                strings. Defaults to expanding every attribute.
+            projection (dict): The include, exclude and rename lists of the
+                attributes copied for each node type. Defaults to copying every
+                attribute.
+            manifest_path (str): The path of a file used to skip SBOM files
+                that have not changed, or whose content was already ingested
+                from another path, since the last run.
+            watch (bool): Keep running after the files in `paths` have been
+                converted and convert new or modified files as they arrive.
+                `paths` must be a directory. Defaults to False.
+            watch_interval (float): The seconds between scans of the directory
+                when watchdog is not installed. Defaults to 5.
+            settle_seconds (float): The seconds a new or modified file must be
+                left unchanged before it is converted. Defaults to 2.
+        """
         if paths is None:
             raise AttributeError(
                 "When using the SBOMExtractor 'paths' is required and cannot be empty"
             )
         p = Path(paths)
         if p.is_dir():
-            self.paths = sorted(Path(paths).rglob("*.json"))
+            self.paths = sorted(
+                f for f in p.rglob("*") if f.is_file() and is_sbom_name(f.name)
+            )
         elif p.is_file():
             self.paths = [p]
+        if watch and not p.is_dir():
+            raise AttributeError(
+                "When using the SBOMExtractor with 'watch' the 'paths' must be a directory"
+            )
+        if streaming and (workers or 1) > 1:
+            raise AttributeError(
+                "When using the SBOMExtractor 'streaming' and 'workers' cannot both be set, workers send back the records of a whole file at once"
+            )
+        self.directory = p
+        self.watch = bool(watch)
+        self.watch_interval = watch_interval
+        self.settle_seconds = settle_seconds
+        self.streaming = bool(streaming)
+        self.workers = workers or 1
+        self.preserve_order = bool(preserve_order)
+        self.node_cache = EmittedNodeCache(
+            DEFAULT_CACHE_SIZE if dedup_cache_size is None else dedup_cache_size
+        )
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.flattener = AttributeFlattener(flatten_max_depth, flatten_keys)
+        self.projection = AttributeProjection(projection) if projection else None
+        self.metrics = ExtractionMetrics()
+        self.decoder = JSONDecoder()
+        self.manifest = FileManifest(manifest_path) if manifest_path else None
+
+    def __stream_elements(
+        self, name: str, document: Union[Path, BinaryIO]
+    ) -> Iterator[dict]:
+        """Streams the elements of an SBOM document, detecting the format from
+        the top level key that identifies it, the bomFormat of CycloneDX or the
+        SPDXID or spdxVersion of SPDX
+
+        Arrays that come before that key are spilled to disk until the format
+        is known, so other JSON files with the same keys, such as the packages
+        and dependencies of a package-lock.json, are not read as an SBOM.
+
+        Args:
+            name (str): The name of the SBOM document
+            document (Union[Path, BinaryIO]): The path or stream of the document
+
+        Yields:
+            SBOMRecord: The elements as soon as each one is written
+        """
+        stream_keys = CycloneDXWriter.STREAM_KEYS + SPDXWriter.STREAM_KEYS
+        head = []
+        try:
+            with (
+                open(document, "r")
+                if isinstance(document, Path)
+                else codecs.getreader("utf-8")(document)
+            ) as f:
+                items = JSONStreamReader(f).items(stream_keys)
+                for key, value in items:
+                    if key in stream_keys and isinstance(value, Iterator):
+                        spill = JSONSpill()
+                        head.append((key, spill))
+                        spill.extend(value)
+                        continue
+                    head.append((key, value))
+                    if key == "bomFormat" and value == "CycloneDX":
+                        writer = CycloneDXWriter({}, self.projection)
+                        break
+                    if key in ("SPDXID", "spdxVersion"):
+                        writer = SPDXWriter({}, self.projection)
+                        break
+                else:
+                    self.logger.warning(
+                        f"The file at path {name} is not a CycloneDX or SPDX SBOM"
+                    )
+                    return
+                yield from writer.write_stream(chain(head, items))
+        finally:
+            for _, value in head:
+                if isinstance(value, JSONSpill):
+                    value.close()
+
+    def __read_elements(
+        self, name: str, document: Union[Path, BinaryIO]
+    ) -> Iterator[SBOMRecord]:
+        """Reads an SBOM document into memory and writes its elements
+
+        Args:
+            name (str): The name of the SBOM document
+            document (Union[Path, BinaryIO]): The path or stream of the document
+
+        Returns:
+            Iterator[SBOMRecord]: The elements of the SBOM
+        """
+        elements = []
+        if isinstance(document, Path):
+            record = self.metrics.parse_file(self.decoder, document)
+        else:
+            record = self.metrics.parse(self.decoder, document.read())
+        if "bomFormat" in record and record["bomFormat"] == "CycloneDX":
+            writer = CycloneDXWriter(record, self.projection)
+            elements = writer.write_document()
+        elif "SPDXID" in record or "spdxVersion" in record:
+            writer = SPDXWriter(record, self.projection)
+            elements = writer.write_document()
+        else:
+            self.logger.warning(
+                f"The file at path {name} is not a CycloneDX or SPDX SBOM"
+            )
+        return elements
+
+    def __convert(self, path: Path) -> Iterator[SBOMRecord]:
+        """Converts the SBOM documents of a file into cleaned records, reading
+        compressed files and archives as a stream
 
-    def __clean_dict(self, data: dict) -> dict:
-        d = data
+        Args:
+            path (Path): The path of the SBOM file
+
+        Yields:
+            SBOMRecord: The records of the SBOM
+        """
+        self.metrics.bytes_read += path.stat().st_size
         try:
-            for key in list(data):
-                if isinstance(d[key], list) and len(d[key]) == 0:
-                    d.pop(key)
+            for name, document in open_documents(path):
+                if self.streaming:
+                    elements = self.__stream_elements(name, document)
                 else:
-                    if key.startswith("__"):
-                        d.pop(key)
-            return dict(flatdict.FlatterDict(d, delimiter=".").items())
+                    elements = self.__read_elements(name, document)
+                yield from self.metrics.measure_file(self.__flatten(elements))
         except Exception as e:
+            self.metrics.errors += 1
+            self.logger.error(f"The file at path {path} could not be read: {e}")
+
+    def __flatten(self, elements: Iterator[SBOMRecord]) -> Iterator[SBOMRecord]:
+        """Flattens the attributes of the elements of an SBOM file
+
+        Args:
+            elements (Iterator[SBOMRecord]): The elements written from the SBOM file
+
+        Yields:
+            SBOMRecord: The records of the SBOM
+        """
+        try:
+            for e in elements:
+                if e is not None:
+                    self.logger.debug(e)
+                    e.attributes = self.metrics.flatten(self.flattener, e.attributes)
+                    yield e
+                else:
+                    self.logger.warning("Skipping an empty element")
+        except Exception as e:
+            self.metrics.errors += 1
             self.logger.error(e)
-            return d
 
-    async def extract_records(self):
-        for path in self.paths:
-            elements = []
-            with open(path, "r") as f:
-                str = f.read()
-                record = json.loads(str)
-                if "bomFormat" in record and record["bomFormat"] == "CycloneDX":
-                    writer = CycloneDXWriter(record)
-                    elements = writer.write_document()
-                elif "SPDXID" in record:
-                    writer = SPDXWriter(record)
-                    elements = writer.write_document()
+    @classmethod
+    def convert_file(
+        cls,
+        path: Path,
+        flattener: AttributeFlattener = None,
+        projection: AttributeProjection = None,
+    ) -> Tuple[list, ExtractionMetrics]:
+        """Converts an SBOM file into cleaned records in a worker process
+
+        Args:
+            path (Path): The path of the SBOM file
+            flattener (AttributeFlattener): The flattener of the record attributes
+            projection (AttributeProjection): The attributes copied for each node type
+
+        Returns:
+            Tuple[list, ExtractionMetrics]: The records of the SBOM, kept as
+                SBOMRecord so they are sent back compactly, and the
+                measurements taken while converting it
+        """
+        extractor = cls(path)
+        if flattener is not None:
+            extractor.flattener = flattener
+        extractor.projection = projection
+        return list(extractor.__convert(path)), extractor.metrics
+
+    def __ingest(
+        self, path: Path, records: Iterable[SBOMRecord], metrics: ExtractionMetrics
+    ) -> Iterator[SBOMRecord]:
+        """Yields the records of a file, then records the file in the manifest
+        if it was converted without errors
+
+        Args:
+            path (Path): The path of the SBOM file
+            records (Iterable[SBOMRecord]): The records of the SBOM
+            metrics (ExtractionMetrics): The measurements taken while converting it
+
+        Yields:
+            SBOMRecord: The records of the SBOM
+        """
+        document_ids = []
+        for e in records:
+            if e.type == CycloneDXWriter.NodeLabels.DOCUMENT.value:
+                document_ids.append(e.id)
+            yield e
+        if self.manifest is not None and metrics.errors == 0:
+            self.manifest.commit(path, document_ids)
+
+    async def __extract_in_parallel(self, paths: list):
+        """Converts the files in a process pool, keeping at most two files per
+        worker in flight
+
+        Args:
+            paths (list): The paths of the SBOM files to convert
+
+        Yields:
+            SBOMRecord: The records of each file as soon as it is converted,
+                or in path order when preserve_order is set
+        """
+        loop = asyncio.get_running_loop()
+        max_in_flight = self.workers * 2
+        paths = iter(paths)
+        paths_by_future = {}
+        pending = deque()
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                for path in islice(paths, max_in_flight - len(pending)):
+                    future = loop.run_in_executor(
+                        pool,
+                        self.convert_file,
+                        path,
+                        self.flattener,
+                        self.projection,
+                    )
+                    paths_by_future[future] = path
+                    pending.append(future)
+                if not pending:
+                    break
+
+                if self.preserve_order:
+                    done = [pending.popleft()]
+                    await done[0]
                 else:
-                    self.logger.info(
-                        f"The file at path {path} is not a valid CycloneDX SBOM"
+                    done, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
                     )
-                    print(f"The file at path {path} is not a valid CycloneDX SBOM")
-            try:
-                for e in elements:
-                    if e is not None:
-                        self.logger.debug(e)
-                        if "attributes" in e:
-                            e["attributes"] = self.__clean_dict(e["attributes"])
+                    for future in done:
+                        pending.remove(future)
+
+                for future in done:
+                    records, metrics = future.result()
+                    self.metrics.merge(metrics)
+                    self.metrics.report()
+                    path = paths_by_future.pop(future)
+                    for e in self.__ingest(path, records, metrics):
                         yield e
-                    else:
-                        print(e)
-            except Exception as e:
-                self.logger.error(e)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def __extract_sequentially(self, paths: list):
+        for path in paths:
+            for e in self.__ingest(path, self.__convert(path), self.metrics):
+                yield e
+            self.metrics.report()
+
+    async def __extract(self, paths: list):
+        """Converts the given files, skipping the ones the manifest shows have
+        not changed
+
+        Args:
+            paths (list): The paths of the SBOM files
+
+        Yields:
+            dict: The deduplicated records of the files, converted from
+                SBOMRecord to the shape read by the pipeline interpretations
+        """
+        if self.manifest is not None:
+            changed = [p for p in paths if self.manifest.check(p)]
+            self.logger.info(
+                f"Skipping {len(paths) - len(changed)} SBOM files that have not changed"
+            )
+            paths = changed
+        if self.workers > 1 and len(paths) > 1:
+            records = self.__extract_in_parallel(paths)
+        else:
+            records = self.__extract_sequentially(paths)
+        async for e in records:
+            e = self.node_cache.deduplicate(e)
+            if e is not None:
+                yield e.to_dict()
+
+    async def extract_records(self):
+        # Created first so files written while the others are converted differ
+        # from its snapshot and are found when watching starts
+        watcher = (
+            DirectoryWatcher(self.directory, self.watch_interval, self.settle_seconds)
+            if self.watch
+            else None
+        )
+        try:
+            if self.manifest is not None:
+                self.manifest.prune(self.paths)
+            async for e in self.__extract(self.paths):
+                yield e
+            if watcher is None:
+                return
+
+            if self.manifest is not None:
+                self.manifest.save()
+            async for paths in watcher.changes():
+                self.logger.info(f"Found {len(paths)} new or modified SBOM files")
+                async for e in self.__extract(paths):
+                    yield e
+                if self.manifest is not None:
+                    self.manifest.save()
+        finally:
+            if self.manifest is not None:
+                self.manifest.save()
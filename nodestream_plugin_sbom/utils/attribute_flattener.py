@@ -0,0 +1,76 @@
+import json
+from typing import Iterable
+
+CONTAINER_TYPES = (dict, list, tuple, set)
+
+
+class AttributeFlattener:
+    """Flattens the attributes of a record into dotted keys in a single pass
+
+    Nested objects become `parent.child` keys and arrays become `parent.0`,
+    `parent.1` keys, the same keys flatdict.FlatterDict produces. Top level
+    keys starting with `__` and empty arrays and objects are dropped. Values
+    nested deeper than `max_depth`, or under a top level key that is not in
+    `flatten_keys`, are kept as a single JSON string instead of being expanded.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = None,
+        flatten_keys: Iterable[str] = None,
+        delimiter: str = ".",
+    ) -> None:
+        """Creates the flattener
+
+        Args:
+            max_depth (int): The number of levels of nesting expanded into dotted
+                keys. Defaults to expanding every level.
+            flatten_keys (Iterable[str]): The top level keys whose nested values
+                are expanded. Defaults to expanding every key.
+            delimiter (str): The separator of the parts of a flattened key
+        """
+        self.max_depth = max_depth
+        self.flatten_keys = None if flatten_keys is None else frozenset(flatten_keys)
+        self.delimiter = delimiter
+
+    def flatten(self, data: dict) -> dict:
+        """Flattens a dict of attributes
+
+        Args:
+            data (dict): The attributes
+
+        Returns:
+            dict: The flattened attributes
+        """
+        flat = {}
+        for key, value in data.items():
+            if key.startswith("__"):
+                continue
+            if isinstance(value, CONTAINER_TYPES):
+                if not value:
+                    continue
+                if (self.max_depth is not None and self.max_depth <= 0) or (
+                    self.flatten_keys is not None and key not in self.flatten_keys
+                ):
+                    flat[key] = json.dumps(value, default=list)
+                else:
+                    self.__flatten(value, key, 1, flat)
+            else:
+                flat[key] = value
+        return flat
+
+    def __flatten(self, value, prefix: str, depth: int, flat: dict):
+        delimiter = self.delimiter
+        expand = self.max_depth is None or depth < self.max_depth
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        for key, child in items:
+            name = f"{prefix}{delimiter}{key}"
+            if isinstance(child, CONTAINER_TYPES):
+                if not child:
+                    continue
+                if expand:
+                    self.__flatten(child, name, depth + 1, flat)
+                else:
+                    flat[name] = json.dumps(child, default=list)
+            else:
+                flat[name] = child
@@ -0,0 +1,73 @@
+from .sbom_writer import SBOMWriter
+
+
+class AttributeProjection:
+    """Selects and renames the attributes copied from the SBOM for each node type
+
+    The configuration maps a node type (Document, Component, Vulnerability,
+    License or Reference) to the keys of the SBOM objects that become its
+    properties:
+
+        Component:
+          include: [name, version, purl]
+          exclude: [hashes]
+          rename: {bom-ref: bomRef}
+
+    `include` keeps only the listed keys, `exclude` drops the listed keys and
+    `rename` changes the name of a kept key. Keys always refer to the SBOM
+    object, before renaming. Node types without a configuration keep every key.
+    """
+
+    def __init__(self, config: dict = None) -> None:
+        """Creates the projection
+
+        Args:
+            config (dict): The include, exclude and rename lists of each node type
+        """
+        node_types = [label.value for label in SBOMWriter.NodeLabels]
+        self.rules = {}
+        for node_type, rule in (config or {}).items():
+            if node_type not in node_types:
+                raise AttributeError(
+                    f"Unknown node type '{node_type}' in the projection, expected one of {node_types}"
+                )
+            rule = rule or {}
+            include = rule.get("include")
+            self.rules[node_type] = (
+                None if include is None else tuple(dict.fromkeys(include)),
+                frozenset(rule.get("exclude") or ()),
+                dict(rule.get("rename") or {}),
+            )
+
+    def project(self, node_type: str, source: dict) -> dict:
+        """Copies the projected attributes of an SBOM object
+
+        Args:
+            node_type (str): The type of the node written from the object
+            source (dict): The SBOM object
+
+        Returns:
+            dict: A new dict with the kept keys, renamed
+        """
+        rule = self.rules.get(node_type)
+        if rule is None:
+            return {**source}
+        include, exclude, rename = rule
+        keys = source if include is None else (k for k in include if k in source)
+        return {rename.get(k, k): source[k] for k in keys if k not in exclude}
+
+    def keeps(self, node_type: str, key: str) -> bool:
+        """Checks if a key is kept for a node type
+
+        Args:
+            node_type (str): The type of the node
+            key (str): The key of the SBOM object
+
+        Returns:
+            bool: True if the key is projected into the attributes
+        """
+        rule = self.rules.get(node_type)
+        if rule is None:
+            return True
+        include, exclude, _ = rule
+        return (include is None or key in include) and key not in exclude
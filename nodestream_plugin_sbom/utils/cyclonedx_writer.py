@@ -1,231 +1,337 @@
 import uuid
-from typing import Iterable
+from typing import Any, Iterable, Iterator, Tuple
+from .json_spill import JSONSpill
+from .sbom_record import SBOMRecord
 from .sbom_writer import SBOMWriter
 
 
 class CycloneDXWriter(SBOMWriter):
-    def write_document(self) -> Iterable:
+    STREAM_KEYS = ("components", "dependencies", "vulnerabilities")
+
+    def __init__(self, bom: dict, projection=None) -> None:
+        super().__init__(bom, projection)
+        # Maps each bom-ref to the id of the component that declared it so
+        # dependencies and vulnerabilities can be linked in constant time
+        self.__component_ids_by_bomref = {}
+        # The dependsOn bom-refs of each component, attached to the component
+        # record itself when the whole document is available
+        self.__depends_on_by_bomref = {}
+        self.__reference_ids = set()
+
+    def write_document(self) -> Iterator[SBOMRecord]:
         """Writes the CycloneDX document
 
-        Args:
-            bom (dict): The dict of the CycloneDX document
-
-        Returns:
-            bool: True if successful, False if not
+        Yields:
+            SBOMRecord: The elements as soon as each one is written
         """
         try:
+            self.__index_components(
+                [self.bom["metadata"]["component"]]
+                if "component" in self.bom.get("metadata", {})
+                else []
+            )
+            self.__index_components(self.bom.get("components", []))
+            dependencies = []
+            for d in self.bom.get("dependencies", []):
+                if "dependsOn" in d and d["ref"] in self.__component_ids_by_bomref:
+                    self.__depends_on_by_bomref.setdefault(d["ref"], []).extend(
+                        d["dependsOn"]
+                    )
+                else:
+                    dependencies.append(d)
+
             self.logger.info("Writing bom metadata")
-            self.__write_bom(self.bom)
+            yield from self.__write_bom(self.bom)
 
             if "components" in self.bom:
-                self.__write_components(self.bom["components"])
+                yield from self.__write_components(self.bom["components"])
 
-            if "dependencies" in self.bom:
-                self.__write_dependencies(self.bom["dependencies"])
+            if dependencies:
+                yield from self.__write_dependencies(dependencies)
 
             if "vulnerabilities" in self.bom:
-                self.__write_vulnerabilities(self.bom["vulnerabilities"])
+                yield from self.__write_vulnerabilities(self.bom["vulnerabilities"])
 
-            return self.elements
+            yield from self.write_licenses()
         except Exception as e:
             self.logger.error(e)
             raise e
 
+    def write_stream(self, items: Iterable[Tuple[str, Any]]) -> Iterator[SBOMRecord]:
+        """Writes a CycloneDX document that is read one top level key at a time
+
+        Args:
+            items (Iterable[Tuple[str, Any]]): The top level keys of the document,
+                with the STREAM_KEYS arrays given as iterators of their items
+
+        Yields:
+            SBOMRecord: The elements as soon as each one is written
+        """
+        deferred = {}
+        try:
+            self.logger.info("Streaming bom")
+            components = []
+            for key, value in items:
+                if key == "components":
+                    for c in value:
+                        yield from self.__write_components([c])
+                        components.append({"type": c["type"], "name": c["name"]})
+                elif key in ("dependencies", "vulnerabilities") and not components:
+                    # These can only be linked once the components are indexed,
+                    # so they are spilled to disk rather than held in memory
+                    deferred[key] = JSONSpill()
+                    deferred[key].extend(value)
+                elif key == "dependencies":
+                    for d in value:
+                        yield from self.__write_dependencies([d])
+                elif key == "vulnerabilities":
+                    for v in value:
+                        yield from self.__write_vulnerabilities([v])
+                else:
+                    if key == "metadata" and "component" in value:
+                        yield from self.__write_components([value.pop("component")])
+                    self.bom[key] = value
+
+            if "dependencies" in deferred:
+                yield from self.__write_dependencies(deferred["dependencies"])
+            if "vulnerabilities" in deferred:
+                yield from self.__write_vulnerabilities(deferred["vulnerabilities"])
+
+            self.bom["components"] = components
+            yield from self.__write_bom(self.bom)
+            yield from self.write_licenses()
+        except Exception as e:
+            self.logger.error(e)
+            raise e
+        finally:
+            for spill in deferred.values():
+                spill.close()
+
     def __write_bom(self, bom):
         """Writes the BOM metadata
 
         Args:
             bom (str): The string of the CycloneDX document
 
-        Returns:
-            dict: The document
+        Yields:
+            SBOMRecord: The metadata component and the document
         """
         if "serialNumber" in bom:
-            document_id = f"{self.NodeLabels.DOCUMENT.value}_{bom['serialNumber']}"
+            document_id = self.node_id(self.NodeLabels.DOCUMENT, bom["serialNumber"])
         else:
-            document_id = f"{self.NodeLabels.DOCUMENT.value}_{uuid.uuid4()}"
+            document_id = self.node_id(self.NodeLabels.DOCUMENT, uuid.uuid4())
 
         if "metadata" in bom and "component":
-            attr = {**bom, **bom["metadata"]}
-            del attr["metadata"]
+            source = {**bom, **bom["metadata"]}
+            del source["metadata"]
         else:
-            attr = {**bom}
-
-        document = {
-            "attributes": attr,
-            "__type": self.NodeLabels.DOCUMENT.value,
-            "__document_id": document_id,
-        }
-
-        if "component" in document["attributes"]:
-            self.__write_components([document["attributes"]["component"]])
-
-        document["describes"] = []
-        for c in document["attributes"]["components"]:
-            document["describes"].append(
-                {
-                    "__toId": f"{self.NodeLabels.COMPONENT.value}_{c['type']}_{c['name']}",
-                }
-            )
+            source = bom
+
+        document = SBOMRecord(
+            self.NodeLabels.DOCUMENT.value,
+            document_id,
+            self.project(self.NodeLabels.DOCUMENT, source),
+        )
+
+        if "component" in source:
+            yield from self.__write_components([source["component"]])
+
+        document.edges["describes"] = [
+            self.edge(self.__component_id(c)) for c in source["components"]
+        ]
 
         self.__remove_attributes_key(document, "component")
         self.__remove_attributes_key(document, "components")
         self.__remove_attributes_key(document, "dependencies")
         self.__remove_attributes_key(document, "vulnerabilities")
 
-        # Do mappings from Cyclone DX to more generic name
-        if "metadata" in document and "timestamp" in document["metadata"]:
-            document["created_timestamp"] = document["metadata"]["timestamp"]
-
-        self.elements.append(document)
+        yield document
 
-    def __write_license(self, licenses: list, toId: str):
-        """Writes the licenses of the BOM to the graph
+    def __add_licenses(self, licenses: list, toId: str):
+        """Adds the licenses of a component to the License records of the document
 
         Args:
-            licenses (list): The licenses to write
+            licenses (list): The licenses to add
             toId (dict): The entity to link the licenses to
         """
         try:
             for lic in licenses:
                 if "license" in lic:
                     if "id" in lic["license"]:
-                        license = {
-                            "attributes": {**lic["license"]},
-                            "__type": self.NodeLabels.LICENSE.value,
-                            "__license_id": f"{self.NodeLabels.LICENSE.value}_{str(lic['license']['id']).lower()}",
-                        }
-                        license["attributes"]["name"] = license["attributes"].pop("id")
+                        attributes = {**lic["license"]}
+                        attributes["name"] = attributes.pop("id")
+                        self.add_license(
+                            self.node_id(
+                                self.NodeLabels.LICENSE,
+                                str(lic["license"]["id"]).lower(),
+                            ),
+                            self.project(self.NodeLabels.LICENSE, attributes),
+                            toId,
+                        )
                     elif "name" in lic["license"]:
-                        license = {
-                            "attributes": {**lic["license"]},
-                            "__type": self.NodeLabels.LICENSE.value,
-                            "__license_id": f"{self.NodeLabels.LICENSE.value}_{str(lic['license']['name']).lower()}",
-                        }
+                        self.add_license(
+                            self.node_id(
+                                self.NodeLabels.LICENSE,
+                                str(lic["license"]["name"]).lower(),
+                            ),
+                            self.project(self.NodeLabels.LICENSE, lic["license"]),
+                            toId,
+                        )
                     else:
                         self.logger.info(
                             f"Skipping License nodes due to no id or name for {lic}"
                         )
-                    license["licensed_by"] = [
-                        {
-                            "__toId": toId,
-                        }
-                    ]
-                    self.elements.append(license)
                 else:
                     self.logger.info("Skipping License nodes due to no 'license' field")
         except Exception as e:
             self.logger.error("Error extracting License nodes", e)
 
+    def __index_components(self, components: list):
+        """Registers the bom-refs of the components, and of their nested
+        components, before any of them are written
+
+        Args:
+            components (list): The components to index
+        """
+        for c in components:
+            if "bom-ref" in c:
+                self.__component_ids_by_bomref.setdefault(
+                    c["bom-ref"], self.__component_id(c)
+                )
+            if "components" in c:
+                self.__index_components(c["components"])
+
+    def __component_id(self, component: dict) -> str:
+        """Builds the id of a component from its type and name
+
+        Args:
+            component (dict): The component
+
+        Returns:
+            str: The id of the component
+        """
+        return self.node_id(
+            self.NodeLabels.COMPONENT, f"{component['type']}_{component['name']}"
+        )
+
     def __write_components(self, components: list):
         """Writes the components of the BOM to the graph
 
         Args:
             components (list): The components to write
             document (dict): The document to link the components to
+
+        Yields:
+            SBOMRecord: The components with their licenses and references
         """
         for c in components:
             if "type" and "name" in c:
-                component = {
-                    "attributes": {**c},
-                    "__type": self.NodeLabels.COMPONENT.value,
-                    "__component_id": f"{self.NodeLabels.COMPONENT.value}_{c['type']}_{c['name']}",
-                }
+                component = SBOMRecord(
+                    self.NodeLabels.COMPONENT.value,
+                    self.__component_id(c),
+                    self.project(self.NodeLabels.COMPONENT, c),
+                )
             else:
                 self.logger.error(f"Component {c['name']} does not contain a bom-ref")
                 raise AttributeError(
                     f"Component {c['name']} does not contain a bom-ref or a name and type attribute"
                 )
 
+            if "bom-ref" in c:
+                self.__component_ids_by_bomref.setdefault(c["bom-ref"], component.id)
+
+            # Nested components are written as components in their own right,
+            # contained by the component that nests them
+            if "components" in c:
+                yield from self.__write_components(c["components"])
+                component.edges["contains"] = [
+                    self.edge(self.__component_id(n)) for n in c["components"]
+                ]
+
             if "licenses" in c:
-                self.__write_license(c["licenses"], component["__component_id"])
+                self.__add_licenses(c["licenses"], component.id)
                 del c["licenses"]
 
             if "externalReferences" in c:
-                self.elements.extend(
-                    [
-                        {
-                            "attributes": {**r},
-                            "__type": self.NodeLabels.REFERENCE.value,
-                            "__reference_id": f"{self.NodeLabels.REFERENCE.value}_{r['url']}",
-                        }
-                        for r in c["externalReferences"]
-                    ]
-                )
-                component["references"] = []
-                component["references"].extend(
-                    [
-                        {
-                            "__toId": f"{self.NodeLabels.REFERENCE.value}_{r['url']}",
-                        }
-                        for r in c["externalReferences"]
-                    ]
-                )
-
-            if "externalReferences" in component["attributes"]:
-                del component["attributes"]["externalReferences"]
+                references = []
+                for r in c["externalReferences"]:
+                    reference_id = self.node_id(self.NodeLabels.REFERENCE, r["url"])
+                    if reference_id not in self.__reference_ids:
+                        self.__reference_ids.add(reference_id)
+                        yield SBOMRecord(
+                            self.NodeLabels.REFERENCE.value,
+                            reference_id,
+                            self.project(self.NodeLabels.REFERENCE, r),
+                        )
+                    references.append(self.edge(reference_id))
+                component.edges["references"] = references
 
             self.__remove_attributes_key(component, "externalReferences")
             self.__remove_attributes_key(component, "licenses")
             self.__remove_attributes_key(component, "dependsOn")
+            self.__remove_attributes_key(component, "components")
 
-            self.elements.append(component)
+            depends_on = self.__depends_on_by_bomref.pop(c.get("bom-ref"), None)
+            if depends_on is not None:
+                component.attributes.update(
+                    self.project(self.NodeLabels.COMPONENT, {"ref": c["bom-ref"]})
+                )
+                component.edges["dependsOn"] = [
+                    self.edge(self.__get_component_id_from_bomref(dep))
+                    for dep in depends_on
+                ]
+
+            yield component
 
     def __write_dependencies(self, dependencies: list):
         """Writes the dependencies and relationships to the graph
 
         Args:
             dependencies (list): The dependencies to write
+
+        Yields:
+            SBOMRecord: The components with their dependencies
         """
         for d in dependencies:
             if "dependsOn" in d:
-                dependency = {
-                    "attributes": {**d},
-                    "__type": self.NodeLabels.COMPONENT.value,
-                    "__component_id": self.__get_component_id_from_bomref(d["ref"]),
-                }
-                dependency["dependsOn"] = []
-                dependency["dependsOn"].extend(
-                    [
-                        {
-                            "__toId": self.__get_component_id_from_bomref(dep),
-                        }
-                        for dep in d["dependsOn"]
-                    ]
+                dependency = SBOMRecord(
+                    self.NodeLabels.COMPONENT.value,
+                    self.__get_component_id_from_bomref(d["ref"]),
+                    self.project(self.NodeLabels.COMPONENT, d),
                 )
+                dependency.edges["dependsOn"] = [
+                    self.edge(self.__get_component_id_from_bomref(dep))
+                    for dep in d["dependsOn"]
+                ]
 
-                if "dependsOn" in dependency["attributes"]:
-                    del dependency["attributes"]["dependsOn"]
-                self.elements.append(dependency)
+                self.__remove_attributes_key(dependency, "dependsOn")
+                yield dependency
 
     def __write_vulnerabilities(self, vulnerabilities: list):
         """Writes the vulnerabilities to the graph
 
         Args:
             vulnerabilities (list): The vulnerabilities to write
+
+        Yields:
+            SBOMRecord: The vulnerabilities
         """
         for v in vulnerabilities:
-            vul = {
-                "attributes": {**v},
-                "__type": self.NodeLabels.VULNERABILITY.value,
-                "__vulnerability_id": f"{self.NodeLabels.VULNERABILITY.value}_{v['id']}",
-            }
-            if "ratings" in v and len(v["ratings"]) > 0:
-                vul["attributes"]["ratings"] = v["ratings"][0]
+            vul = SBOMRecord(
+                self.NodeLabels.VULNERABILITY.value,
+                self.node_id(self.NodeLabels.VULNERABILITY, v["id"]),
+                self.project(self.NodeLabels.VULNERABILITY, v),
+            )
+            if "ratings" in vul.attributes and len(v["ratings"]) > 0:
+                vul.attributes["ratings"] = v["ratings"][0]
 
             if "affects" in v:
-                vul["affects"] = []
-                vul["affects"].extend(
-                    [
-                        {
-                            "__toId": self.__get_component_id_from_bomref(a["ref"]),
-                        }
-                        for a in v["affects"]
-                    ]
-                )
-            if "affects" in vul["attributes"]:
-                del vul["attributes"]["affects"]
-            self.elements.append(vul)
+                vul.edges["affects"] = [
+                    self.edge(self.__get_component_id_from_bomref(a["ref"]))
+                    for a in v["affects"]
+                ]
+            self.__remove_attributes_key(vul, "affects")
+            yield vul
 
     def __get_component_id_from_bomref(self, bomref: str) -> str:
         """Gets the correct component id for the specified bomref
@@ -236,23 +342,14 @@ class CycloneDXWriter(SBOMWriter):
         Returns:
             str: The component id, or None
         """
-        return next(
-            (
-                item["__component_id"]
-                for item in self.elements
-                if item["__type"] == self.NodeLabels.COMPONENT.value
-                and "bom-ref" in item["attributes"]
-                and item["attributes"]["bom-ref"] == bomref
-            ),
-            None,
-        )
+        return self.__component_ids_by_bomref.get(bomref)
 
-    def __remove_attributes_key(self, entity: dict, key: str):
-        """Removes the specified key from the "attributes" key of the entity
+    def __remove_attributes_key(self, entity: SBOMRecord, key: str):
+        """Removes the specified key from the attributes of the entity
 
         Args:
-            entity (dict): The entity to remove the key from
-            key (str): The key to remove from the "attributes" key of the entity
+            entity (SBOMRecord): The entity to remove the key from
+            key (str): The key to remove from the attributes of the entity
         """
-        if key in entity["attributes"]:
-            del entity["attributes"][key]
+        if key in entity.attributes:
+            del entity.attributes[key]
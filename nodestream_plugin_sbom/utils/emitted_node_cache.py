@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import Optional
+
+from .sbom_record import SBOMRecord
+from .sbom_writer import SBOMWriter
+
+DEFAULT_CACHE_SIZE = 10000
+
+
+class EmittedNodeCache:
+    """Remembers the License and Reference nodes already emitted during a run
+
+    These nodes are shared by many components across many documents, so once
+    a node has been sent its properties are not sent again. The cache is
+    bounded and evicts the least recently used keys first.
+    """
+
+    NODE_TYPES = (
+        SBOMWriter.NodeLabels.LICENSE.value,
+        SBOMWriter.NodeLabels.REFERENCE.value,
+    )
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """Creates the cache
+
+        Args:
+            max_size (int): The number of node keys to remember, 0 disables the cache
+        """
+        self.max_size = max_size
+        self.__keys = OrderedDict()
+
+    def deduplicate(self, element: SBOMRecord) -> Optional[SBOMRecord]:
+        """Strips the properties from a node that has already been emitted
+
+        Args:
+            element (SBOMRecord): The element to check
+
+        Returns:
+            Optional[SBOMRecord]: The element, the element with only its
+                relationships if the node was already emitted, or None if
+                nothing is left to send
+        """
+        if element.type not in self.NODE_TYPES or self.max_size <= 0:
+            return element
+
+        key = element.id
+        if key not in self.__keys:
+            self.__keys[key] = None
+            if len(self.__keys) > self.max_size:
+                self.__keys.popitem(last=False)
+            return element
+
+        self.__keys.move_to_end(key)
+        if "licensed_by" in element.edges:
+            return SBOMRecord(
+                element.type, key, {}, {"licensed_by": element.edges["licensed_by"]}
+            )
+        return None
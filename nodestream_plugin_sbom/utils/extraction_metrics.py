@@ -0,0 +1,192 @@
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Union
+
+from nodestream.metrics import NON_FATAL_ERRORS, Metric, Metrics
+
+from .sbom_record import SBOMRecord
+from .sbom_writer import SBOMWriter
+
+SBOM_FILES = Metric("sbom_files", "Number of SBOM files converted", accumulate=True)
+SBOM_BYTES_READ = Metric(
+    "sbom_bytes_read", "Number of bytes of SBOM files read", accumulate=True
+)
+SBOM_FETCH_SECONDS = Metric(
+    "sbom_fetch_seconds",
+    "Seconds spent downloading SBOM files, summed over concurrent downloads",
+    accumulate=True,
+)
+SBOM_PARSE_SECONDS = Metric(
+    "sbom_parse_seconds", "Seconds spent parsing SBOM files", accumulate=True
+)
+SBOM_CONVERT_SECONDS = Metric(
+    "sbom_convert_seconds",
+    "Seconds spent converting SBOM files into records, including flattening",
+    accumulate=True,
+)
+SBOM_FLATTEN_SECONDS = Metric(
+    "sbom_flatten_seconds",
+    "Seconds spent flattening record attributes",
+    accumulate=True,
+)
+SBOM_BACKPRESSURE_SECONDS = Metric(
+    "sbom_backpressure_seconds",
+    "Seconds spent waiting for the pipeline to take the records",
+    accumulate=True,
+)
+SBOM_MAX_FILE_SECONDS = Metric(
+    "sbom_max_file_seconds", "Longest time spent converting an SBOM file"
+)
+SBOM_RECORDS = {
+    label.value: Metric(
+        f"sbom_{label.value.lower()}_records",
+        f"Number of {label.value} records written",
+        accumulate=True,
+    )
+    for label in SBOMWriter.NodeLabels
+}
+
+
+class ExtractionMetrics:
+    """Times the stages of converting SBOM files into records
+
+    The measurements are accumulated on plain attributes, so they are cheap
+    enough to take for every record and can be sent back from a worker
+    process, and are sent to the nodestream metrics handler by `report`.
+    """
+
+    def __init__(self) -> None:
+        self.max_file_seconds = 0.0
+        self.__reported_max_file_seconds = 0.0
+        self.reset()
+
+    def reset(self):
+        """Clears the measurements taken since the last report"""
+        self.files = 0
+        self.bytes_read = 0
+        self.fetch_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.convert_seconds = 0.0
+        self.flatten_seconds = 0.0
+        self.backpressure_seconds = 0.0
+        self.errors = 0
+        self.records_by_type = {}
+
+    def parse(self, decoder, content: Union[str, bytes]) -> Any:
+        """Parses a JSON document, counting the time spent
+
+        Args:
+            decoder (JSONDecoder): The decoder of the document
+            content (Union[str, bytes]): The JSON document
+
+        Returns:
+            Any: The parsed document
+        """
+        start = time.perf_counter()
+        document = decoder.loads(content)
+        self.parse_seconds += time.perf_counter() - start
+        return document
+
+    def parse_file(self, decoder, path: Path) -> Any:
+        """Reads and parses a JSON file, counting the time spent
+
+        Args:
+            decoder (JSONDecoder): The decoder of the file
+            path (Path): The path of the file
+
+        Returns:
+            Any: The parsed document
+        """
+        start = time.perf_counter()
+        document = decoder.load_file(path)
+        self.parse_seconds += time.perf_counter() - start
+        return document
+
+    def flatten(self, flattener, attributes: dict) -> dict:
+        """Flattens the attributes of a record, counting the time spent
+
+        Args:
+            flattener (AttributeFlattener): The flattener of the record attributes
+            attributes (dict): The attributes to flatten
+
+        Returns:
+            dict: The flattened attributes
+        """
+        start = time.perf_counter()
+        attributes = flattener.flatten(attributes)
+        self.flatten_seconds += time.perf_counter() - start
+        return attributes
+
+    def measure_file(self, records: Iterable[SBOMRecord]) -> Iterator[SBOMRecord]:
+        """Times the conversion of an SBOM file, apart from the time spent
+        waiting for the records to be taken
+
+        Args:
+            records (Iterable[SBOMRecord]): The records of the SBOM file
+
+        Yields:
+            SBOMRecord: The records, counted by node type
+        """
+        file_seconds = 0.0
+        start = time.perf_counter()
+        for record in records:
+            now = time.perf_counter()
+            file_seconds += now - start
+            self.records_by_type[record.type] = (
+                self.records_by_type.get(record.type, 0) + 1
+            )
+            yield record
+            start = time.perf_counter()
+            self.backpressure_seconds += start - now
+        file_seconds += time.perf_counter() - start
+        self.convert_seconds += file_seconds
+        self.files += 1
+        self.max_file_seconds = max(self.max_file_seconds, file_seconds)
+
+    def merge(self, other: "ExtractionMetrics"):
+        """Adds the measurements of another instance, such as the ones taken in
+        a worker process
+
+        Args:
+            other (ExtractionMetrics): The measurements to add
+        """
+        self.files += other.files
+        self.bytes_read += other.bytes_read
+        self.fetch_seconds += other.fetch_seconds
+        self.parse_seconds += other.parse_seconds
+        self.convert_seconds += other.convert_seconds
+        self.flatten_seconds += other.flatten_seconds
+        self.backpressure_seconds += other.backpressure_seconds
+        self.errors += other.errors
+        for record_type, count in other.records_by_type.items():
+            self.records_by_type[record_type] = (
+                self.records_by_type.get(record_type, 0) + count
+            )
+        self.max_file_seconds = max(self.max_file_seconds, other.max_file_seconds)
+
+    def report(self):
+        """Sends the measurements taken since the last report to the nodestream
+        metrics handler"""
+        metrics = Metrics.get()
+        for metric, value in (
+            (SBOM_FILES, self.files),
+            (SBOM_BYTES_READ, self.bytes_read),
+            (SBOM_FETCH_SECONDS, self.fetch_seconds),
+            (SBOM_PARSE_SECONDS, self.parse_seconds),
+            (SBOM_CONVERT_SECONDS, self.convert_seconds),
+            (SBOM_FLATTEN_SECONDS, self.flatten_seconds),
+            (SBOM_BACKPRESSURE_SECONDS, self.backpressure_seconds),
+            (NON_FATAL_ERRORS, self.errors),
+        ):
+            if value:
+                metrics.increment(metric, value)
+        for record_type, count in self.records_by_type.items():
+            if record_type in SBOM_RECORDS:
+                metrics.increment(SBOM_RECORDS[record_type], count)
+        if self.max_file_seconds > self.__reported_max_file_seconds:
+            metrics.increment(
+                SBOM_MAX_FILE_SECONDS,
+                self.max_file_seconds - self.__reported_max_file_seconds,
+            )
+            self.__reported_max_file_seconds = self.max_file_seconds
+        self.reset()
@@ -0,0 +1,87 @@
+import gc
+import importlib
+import mmap
+from pathlib import Path
+from typing import Any, Union
+
+# The JSON libraries in order of preference
+BACKENDS = ("orjson", "simdjson", "json")
+# Files at least this large are memory mapped instead of read into memory
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+
+class JSONDecoder:
+    """Decodes JSON documents from bytes with the fastest JSON library installed
+
+    orjson is used when it is installed, then pysimdjson, then the standard
+    library. Documents are decoded straight from bytes, without decoding them
+    into a string first, and large files are memory mapped when the library
+    can read from a buffer. The garbage collector is paused while decoding,
+    as the many objects created cannot form cycles and would otherwise
+    trigger repeated collections.
+    """
+
+    def __init__(self, backend: str = None) -> None:
+        """Creates the decoder
+
+        Args:
+            backend (str): The JSON library to use, one of orjson, simdjson or
+                json. Defaults to the first of these that is installed.
+        """
+        if backend is not None and backend not in BACKENDS:
+            raise AttributeError(
+                f"Unknown JSON backend '{backend}', expected one of {', '.join(BACKENDS)}"
+            )
+        for name in (backend,) if backend else BACKENDS:
+            try:
+                module = importlib.import_module(name)
+            except ImportError:
+                if backend is not None:
+                    raise AttributeError(
+                        f"The JSON backend '{backend}' is not installed"
+                    )
+                continue
+            self.backend = name
+            self.__loads = module.loads
+            break
+        # Only orjson decodes from a memoryview without copying it to bytes
+        self.reads_buffers = self.backend == "orjson"
+
+    def __getstate__(self) -> dict:
+        return {"backend": self.backend}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["backend"])
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        """Decodes a JSON document
+
+        Args:
+            content (Union[bytes, str]): The JSON document
+
+        Returns:
+            Any: The decoded document
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self.__loads(content)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def load_file(self, path: Path) -> Any:
+        """Decodes a JSON file, reading it as bytes
+
+        Args:
+            path (Path): The path of the file
+
+        Returns:
+            Any: The decoded document
+        """
+        with open(path, "rb") as f:
+            if not self.reads_buffers or Path(path).stat().st_size < MMAP_THRESHOLD:
+                return self.loads(f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return self.loads(view)
@@ -0,0 +1,54 @@
+import json
+import tempfile
+from typing import Any, Iterable, Iterator
+
+
+class JSONSpill:
+    """A sequence of JSON values kept in a temporary file instead of memory
+
+    Each value is written as one line when it is added and decoded again
+    when the spill is iterated, so an array that can only be processed once
+    the rest of the document has been read takes disk space rather than
+    memory. The file is removed when the spill is closed.
+    """
+
+    def __init__(self) -> None:
+        self.file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.count = 0
+
+    def __enter__(self) -> "JSONSpill":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def extend(self, values: Iterable[Any]):
+        """Writes values to the end of the spill
+
+        Args:
+            values (Iterable[Any]): The JSON values to write
+        """
+        for value in values:
+            # Newlines in strings are escaped, so every value is a single line
+            self.file.write(json.dumps(value))
+            self.file.write("\n")
+            self.count += 1
+
+    def __iter__(self) -> Iterator[Any]:
+        """Reads the values back in the order they were written
+
+        Yields:
+            Any: Each value, decoded as it is read
+        """
+        self.file.flush()
+        self.file.seek(0)
+        for line in self.file:
+            yield json.loads(line)
+        self.file.seek(0, 2)
+
+    def close(self):
+        """Removes the temporary file"""
+        self.file.close()
@@ -0,0 +1,135 @@
+import json
+from typing import IO, Any, Iterable, Iterator, Tuple
+
+WHITESPACE = " \t\n\r"
+# The characters that can follow a complete value inside a document
+DELIMITERS = ",]}" + WHITESPACE
+
+
+class JSONStreamReader:
+    """Incrementally reads the top level object of a JSON document
+
+    Only the text needed to decode the current value is held in memory, so
+    arrays that are streamed one item at a time are bounded by the size of
+    their largest item rather than the size of the document.
+    """
+
+    def __init__(self, fp: IO[str], chunk_size: int = 65536) -> None:
+        """Creates a reader over a text file object
+
+        Args:
+            fp (IO[str]): The file object to read from
+            chunk_size (int): The number of characters to read at a time
+        """
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def items(self, stream_keys: Iterable[str] = ()) -> Iterator[Tuple[str, Any]]:
+        """Yields the key/value pairs of the top level object
+
+        Args:
+            stream_keys (Iterable[str]): The keys whose array values should be
+                yielded as an iterator of items instead of a decoded list
+
+        Yields:
+            Tuple[str, Any]: The key and its value. A streamed value must be
+                consumed before the next pair is requested, any items left are
+                skipped.
+        """
+        stream_keys = set(stream_keys)
+        self.__expect("{")
+        if self.__peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.__value()
+            self.__expect(":")
+            if key in stream_keys and self.__peek() == "[":
+                items = self.__array_items()
+                yield key, items
+                for _ in items:
+                    pass
+            else:
+                yield key, self.__value()
+
+            separator = self.__peek()
+            self.position += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise json.JSONDecodeError(
+                    "Expecting ',' delimiter", self.buffer, self.position - 1
+                )
+
+    def __array_items(self) -> Iterator[Any]:
+        """Yields the items of the array at the current position one at a time"""
+        self.__expect("[")
+        if self.__peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.__value()
+            separator = self.__peek()
+            self.position += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise json.JSONDecodeError(
+                    "Expecting ',' delimiter", self.buffer, self.position - 1
+                )
+
+    def __value(self) -> Any:
+        """Decodes the value at the current position, reading more as needed"""
+        self.__peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number cut by the end of a chunk decodes short, e.g. 1.5e
+                # as 1.5, so it is only complete once a delimiter follows it
+                if (
+                    self.eof
+                    or not isinstance(value, (int, float))
+                    or (end < len(self.buffer) and self.buffer[end] in DELIMITERS)
+                ):
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the read size so large values are not decoded over and over
+            self.__fill(read_size)
+            read_size *= 2
+
+    def __peek(self) -> str:
+        """Skips whitespace and returns the next character, or '' at the end"""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return ""
+            self.__fill(self.chunk_size)
+
+    def __expect(self, character: str):
+        if self.__peek() != character:
+            raise json.JSONDecodeError(
+                f"Expecting '{character}'", self.buffer, self.position
+            )
+        self.position += 1
+
+    def __fill(self, size: int):
+        """Drops the consumed text from the buffer and reads the next chunk"""
+        chunk = self.fp.read(size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
@@ -0,0 +1,88 @@
+from typing import Union
+
+# The record field holding the id of each node type, e.g. __component_id
+ID_FIELDS = {}
+
+
+class Edge:
+    """An edge to the node with the given id"""
+
+    __slots__ = ("to_id",)
+
+    def __init__(self, to_id: str) -> None:
+        self.to_id = to_id
+
+    def __reduce__(self):
+        return (Edge, (self.to_id,))
+
+    def __repr__(self) -> str:
+        return f"Edge({self.to_id!r})"
+
+    def to_dict(self) -> dict:
+        """Converts the edge to the shape read by the pipeline interpretations
+
+        Returns:
+            dict: The id of the node the edge points to, as __toId
+        """
+        return {"__toId": self.to_id}
+
+
+class SBOMRecord:
+    """A node written from an SBOM document, with the edges it starts
+
+    The writers and extractors pass records in this form, which holds no
+    per-record keys and shares one interned id string and one Edge between
+    every record pointing to the same node. Each record is converted to the
+    dict read by the pipeline interpretations with `to_dict` only as the
+    extractor yields it.
+    """
+
+    __slots__ = ("type", "id", "attributes", "edges")
+
+    def __init__(
+        self, type: str, id: str, attributes: dict, edges: dict = None
+    ) -> None:
+        """Creates the record
+
+        Args:
+            type (str): The node label, e.g. Component
+            id (str): The id of the node
+            attributes (dict): The properties of the node
+            edges (dict): The edges of the node by record field, each a list
+                of edges or a dict of lists of edges by relationship type.
+                Defaults to no edges.
+        """
+        self.type = type
+        self.id = id
+        self.attributes = attributes
+        self.edges = {} if edges is None else edges
+
+    def __reduce__(self):
+        return (SBOMRecord, (self.type, self.id, self.attributes, self.edges))
+
+    def __repr__(self) -> str:
+        return f"SBOMRecord({self.type!r}, {self.id!r})"
+
+    def to_dict(self) -> dict:
+        """Converts the record to the shape read by the pipeline interpretations
+
+        Returns:
+            dict: The attributes, the __type, the id as __<type>_id and a list
+                of {"__toId": id} dicts for each field of edges
+        """
+        id_field = ID_FIELDS.get(self.type)
+        if id_field is None:
+            id_field = ID_FIELDS[self.type] = f"__{self.type.lower()}_id"
+        record = {"attributes": self.attributes, "__type": self.type, id_field: self.id}
+        for field, edges in self.edges.items():
+            record[field] = self.__edges_to_dict(edges)
+        return record
+
+    @staticmethod
+    def __edges_to_dict(edges: Union[list, dict]) -> Union[list, dict]:
+        if isinstance(edges, dict):
+            return {
+                relationship: [{"__toId": e.to_id} for e in group]
+                for relationship, group in edges.items()
+            }
+        return [{"__toId": e.to_id} for e in edges]
@@ -0,0 +1,116 @@
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Tuple, Union
+
+# The suffixes of compressed JSON documents
+COMPRESSED_SUFFIXES = (".gz", ".zst", ".bz2", ".xz")
+# The suffixes of tar archives, optionally compressed
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.zst", ".tar.bz2", ".tar.xz")
+ZIP_SUFFIX = ".zip"
+
+
+def is_json_name(name: str) -> bool:
+    """Checks if a file name is that of a JSON document, optionally compressed
+
+    Args:
+        name (str): The file name
+
+    Returns:
+        bool: True for .json files and compressed .json files, e.g. .json.gz
+    """
+    name = name.lower()
+    return name.endswith(".json") or any(
+        name.endswith(f".json{suffix}") for suffix in COMPRESSED_SUFFIXES
+    )
+
+
+def is_sbom_name(name: str) -> bool:
+    """Checks if a file name is that of a JSON document or of an archive that
+    may hold JSON documents
+
+    Args:
+        name (str): The file name
+
+    Returns:
+        bool: True for JSON documents, tar archives and zip archives
+    """
+    return is_json_name(name) or name.lower().endswith(TAR_SUFFIXES + (ZIP_SUFFIX,))
+
+
+def decompress(stream: BinaryIO, name: str) -> BinaryIO:
+    """Wraps a stream in the decompressor matching the suffix of its name
+
+    Args:
+        stream (BinaryIO): The stream to read from
+        name (str): The file name of the stream
+
+    Returns:
+        BinaryIO: The decompressed stream, or the stream itself if the name
+            has no compression suffix
+    """
+    name = name.lower()
+    if name.endswith((".gz", ".tgz")):
+        return gzip.GzipFile(fileobj=stream)
+    if name.endswith(".bz2"):
+        return bz2.BZ2File(stream)
+    if name.endswith(".xz"):
+        return lzma.LZMAFile(stream)
+    if name.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                f"Reading {name} requires the zstandard package, install the zstd extra"
+            )
+        return zstandard.ZstdDecompressor().stream_reader(stream, closefd=False)
+    return stream
+
+
+def open_documents(
+    source: Union[Path, bytes], name: str = None
+) -> Iterator[Tuple[str, Union[Path, BinaryIO]]]:
+    """Opens the JSON documents in a file or in the content of an object
+
+    Plain JSON files are yielded as their path so they can be memory mapped,
+    compressed files as a decompressing stream and archives as a stream for
+    each JSON member, read in order without extracting the archive.
+
+    Args:
+        source (Union[Path, bytes]): The path of the file or the content of the object
+        name (str): The name of the file or object, used to detect its format.
+            Defaults to the path.
+
+    Yields:
+        Tuple[str, Union[Path, BinaryIO]]: The name and the path or stream of
+            each document. A stream must be read before the next document is
+            requested.
+    """
+    name = str(source) if name is None else name
+    lower = name.lower()
+    if isinstance(source, Path) and lower.endswith(".json"):
+        yield name, source
+        return
+
+    with open(source, "rb") if isinstance(source, Path) else io.BytesIO(source) as raw:
+        if lower.endswith(ZIP_SUFFIX):
+            with zipfile.ZipFile(raw) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and is_json_name(info.filename):
+                        with archive.open(info) as member:
+                            yield f"{name}/{info.filename}", decompress(
+                                member, info.filename
+                            )
+        elif lower.endswith(TAR_SUFFIXES):
+            with tarfile.open(fileobj=decompress(raw, lower), mode="r|") as archive:
+                for member in archive:
+                    if member.isfile() and is_json_name(member.name):
+                        yield f"{name}/{member.name}", decompress(
+                            archive.extractfile(member), member.name
+                        )
+        else:
+            yield name, decompress(raw, lower)
@@ -1,6 +1,9 @@
 from enum import Enum
 from abc import ABC, abstractmethod
+from typing import Any, Iterable, Iterator, Tuple
 import logging
+import sys
+from .sbom_record import Edge, SBOMRecord
 
 
 class SBOMWriter(ABC):
@@ -21,11 +24,113 @@ class SBOMWriter(ABC):
         AFFECTS = "AFFECTS"
         LICENSED_BY = "LICENSED_BY"
 
-    def __init__(self, bom: dict) -> None:
+    def __init__(self, bom: dict, projection=None) -> None:
+        """Creates the writer
+
+        Args:
+            bom (dict): The SBOM document
+            projection (AttributeProjection): The attributes copied for each
+                node type. Defaults to copying every attribute.
+        """
         self.bom = bom
+        self.projection = projection
+        # The License records of the document, each holding every component
+        # it licenses, keyed by license id
+        self.licenses = {}
+        # The edge to each node id, shared by every record pointing to the node
+        self.__edges = {}
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.elements = []
+
+    @staticmethod
+    def node_id(node_type: NodeLabels, key: Any) -> str:
+        """Builds the id of a node, interned so every record and edge holding
+        the id shares a single string
+
+        Args:
+            node_type (NodeLabels): The type of the node
+            key (Any): The key of the node within its type
+
+        Returns:
+            str: The id of the node, e.g. Component_library_name
+        """
+        return sys.intern(f"{node_type.value}_{key}")
+
+    def edge(self, to_id: str) -> Edge:
+        """Gets the edge to a node, so the id only has to be interned the
+        first time an edge to the node is written
+
+        Args:
+            to_id (str): The id of the node
+
+        Returns:
+            Edge: The edge, shared by every record of the document pointing
+                to the node
+        """
+        edge = self.__edges.get(to_id)
+        if edge is None:
+            edge = self.__edges[to_id] = Edge(
+                to_id if to_id is None else sys.intern(to_id)
+            )
+        return edge
+
+    def project(self, node_type: NodeLabels, source: dict) -> dict:
+        """Copies the attributes of a node from an SBOM object
+
+        Args:
+            node_type (NodeLabels): The type of the node
+            source (dict): The SBOM object
+
+        Returns:
+            dict: The attributes of the node
+        """
+        if self.projection is None:
+            return {**source}
+        return self.projection.project(node_type.value, source)
+
+    def keeps(self, node_type: NodeLabels, key: str) -> bool:
+        """Checks if an attribute is kept for a node type
+
+        Args:
+            node_type (NodeLabels): The type of the node
+            key (str): The key of the attribute in the SBOM object
+
+        Returns:
+            bool: True if the attribute is kept
+        """
+        return self.projection is None or self.projection.keeps(node_type.value, key)
+
+    def add_license(self, license_id: str, attributes: dict, to_id: str):
+        """Adds a component to the License record of the document
+
+        Args:
+            license_id (str): The id of the license
+            attributes (dict): The attributes of the license, used when the
+                license is first seen
+            to_id (str): The id of the component licensed by the license
+        """
+        if license_id not in self.licenses:
+            self.licenses[license_id] = (attributes, {})
+        self.licenses[license_id][1][to_id] = None
+
+    def write_licenses(self) -> Iterator[SBOMRecord]:
+        """Writes the License records of the document
+
+        Yields:
+            SBOMRecord: One record per license with all of the components it licenses
+        """
+        for license_id, (attributes, to_ids) in self.licenses.items():
+            yield SBOMRecord(
+                self.NodeLabels.LICENSE.value,
+                license_id,
+                attributes,
+                {"licensed_by": [self.edge(to_id) for to_id in to_ids]},
+            )
+        self.licenses = {}
+
+    @abstractmethod
+    def write_document(self) -> Iterator[SBOMRecord]:
+        raise NotImplementedError
 
     @abstractmethod
-    def write_document(self):
+    def write_stream(self, items: Iterable[Tuple[str, Any]]) -> Iterator[SBOMRecord]:
         raise NotImplementedError
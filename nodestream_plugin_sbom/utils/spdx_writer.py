@@ -1,28 +1,81 @@
 import uuid
-from typing import Any
+from typing import Any, Iterable, Iterator, Tuple
+from .sbom_record import SBOMRecord
 from .sbom_writer import SBOMWriter
 
 
 class SPDXWriter(SBOMWriter):
-    def write_document(self):
-        """ "This writes the SPDX document
+    STREAM_KEYS = ("packages", "relationships")
+    # The document record field holding the edges of each relationship type,
+    # other elements hold them in a relationships map keyed by the type
+    RELATIONSHIP_FIELDS = {
+        "DESCRIBES": "describes",
+        "DEPENDS_ON": "depends_on",
+        "DEPENDENCY_OF": "dependency_of",
+        "DESCRIBED_BY": "described_by",
+        "CONTAINS": "contains",
+    }
 
-        Args:
-            bom (dict): The dict of the BOM
+    def __init__(self, bom: dict, projection=None) -> None:
+        super().__init__(bom, projection)
+        # The relationship edges by type keyed by the SPDXID of their source
+        # element, so each element carries its own edges
+        self.__edges_by_element = {}
+        self.__reference_ids = set()
 
-        Returns:
-            bool: True if successful, False if not
+    def write_document(self) -> Iterator[SBOMRecord]:
+        """ "This writes the SPDX document
+
+        Yields:
+            SBOMRecord: The elements as soon as each one is written
         """
         try:
+            self.__index_relationships(self.bom.get("relationships", []))
+
             self.logger.info("Writing bom metadata")
 
-            self.__write_bom(self.bom)
+            yield from self.__write_bom(self.bom)
 
             if "packages" in self.bom:
                 self.logger.info("Writing packages as components")
-                self.__write_packages(self.bom["packages"])
+                yield from self.__write_packages(self.bom["packages"])
+
+            yield from self.__write_element_relationships()
+            yield from self.write_licenses()
+        except Exception as e:
+            self.logger.error(e)
+            raise e
+
+    def write_stream(self, items: Iterable[Tuple[str, Any]]) -> Iterator[SBOMRecord]:
+        """Writes an SPDX document that is read one top level key at a time
+
+        Args:
+            items (Iterable[Tuple[str, Any]]): The top level keys of the document,
+                with the STREAM_KEYS arrays given as iterators of their items
 
-            return self.elements
+        Yields:
+            SBOMRecord: The elements as soon as each one is written
+        """
+        try:
+            self.logger.info("Streaming bom")
+            packages = []
+            for key, value in items:
+                if key == "packages":
+                    for p in value:
+                        yield from self.__write_packages([p])
+                        packages.append({"SPDXID": p["SPDXID"]})
+                elif key == "relationships":
+                    # Only the edges are kept, grouped by their source element
+                    self.__index_relationships(value)
+                    self.bom[key] = []
+                else:
+                    self.bom[key] = value
+
+            if "relationships" in self.bom:
+                self.bom["packages"] = packages
+            yield from self.__write_bom(self.bom)
+            yield from self.__write_element_relationships()
+            yield from self.write_licenses()
         except Exception as e:
             self.logger.error(e)
             raise e
@@ -33,194 +86,192 @@ class SPDXWriter(SBOMWriter):
         Args:
             bom (str): The string of the CycloneDX document
 
-        Returns:
-            dict: The document
+        Yields:
+            SBOMRecord: The document
         """
-        document_id = f"{self.NodeLabels.DOCUMENT.value}_{uuid.uuid4()}"
-        document = {
-            "attributes": {**bom, **bom["creationInfo"]},
-            "__type": self.NodeLabels.DOCUMENT.value,
-            "__document_id": document_id,
-        }
-        # Remove the creationInfo as it is promoted to top level attributes
-        self.__remove_attributes_key(document, "creationInfo")
+        document_id = self.node_id(self.NodeLabels.DOCUMENT, uuid.uuid4())
+        # The creationInfo is promoted to top level attributes
+        source = {**bom, **bom["creationInfo"]}
+        del source["creationInfo"]
+        document = SBOMRecord(
+            self.NodeLabels.DOCUMENT.value,
+            document_id,
+            self.project(self.NodeLabels.DOCUMENT, source),
+        )
 
         # Do mappings from Cyclone DX to more generic name
-        document["attributes"]["specVersion"] = document["attributes"].pop(
-            "spdxVersion"
-        )
-        document["attributes"]["createdTimestamp"] = document["attributes"].pop(
-            "created"
-        )
-        document["attributes"]["bomFormat"] = "SPDX"
+        if "spdxVersion" in document.attributes:
+            document.attributes["specVersion"] = document.attributes.pop("spdxVersion")
+        if "created" in document.attributes:
+            document.attributes["createdTimestamp"] = document.attributes.pop("created")
+        if self.keeps(self.NodeLabels.DOCUMENT, "bomFormat"):
+            document.attributes["bomFormat"] = "SPDX"
 
-        if "relationships" in document["attributes"]:
-            document = self.__write_relationships(self.bom["relationships"], document)
+        if "relationships" in source:
+            document = self.__write_relationships(document, source)
             self.__remove_attributes_key(document, "relationships")
 
-        self.elements.append(document)
+        yield document
 
-    def __write_licenses(self, licenses: Any, toId: str):
-        """Writes the license of the BOM to the graph
+    def __add_licenses(self, licenses: Any, toId: str):
+        """Adds the licenses of a package to the License records of the document
 
         Args:
-            license (Any): The licenses to write
+            license (Any): The licenses to add
             toId (str): The id of the node to connect to
         """
         # Adding a ternary operation here to ensure that licenses is a list since it can have a cardinality of 0..N
         licenses = [licenses] if isinstance(licenses, str) else licenses
         for license in licenses:
-            license = {
-                "attributes": {"name": license},
-                "__type": self.NodeLabels.LICENSE.value,
-                "__license_id": f"{self.NodeLabels.LICENSE.value}_{license.lower()}",
-            }
-            license["licensed_by"] = [
-                {
-                    "__toId": toId,
-                }
-            ]
-            self.elements.append(license)
+            self.add_license(
+                self.node_id(self.NodeLabels.LICENSE, license.lower()),
+                self.project(self.NodeLabels.LICENSE, {"name": license}),
+                toId,
+            )
 
     def __write_packages(self, packages: list):
         """Writes the packages of the BOM to the graph
 
         Args:
             packages (list): The packages to write
+
+        Yields:
+            SBOMRecord: The components with their licenses and references
         """
 
         for c in packages:
-            component = {
-                "attributes": {**c},
-                "__type": self.NodeLabels.COMPONENT.value,
-                "__component_id": f"{self.NodeLabels.COMPONENT.value}_{c['SPDXID']}",
-            }
+            component = SBOMRecord(
+                self.NodeLabels.COMPONENT.value,
+                self.node_id(self.NodeLabels.COMPONENT, c["SPDXID"]),
+                self.project(self.NodeLabels.COMPONENT, c),
+            )
 
             # Pull out the external references into there own nodes
-            if "externalRefs" in component["attributes"]:
-                component["references"] = []
-                for r in component["attributes"]["externalRefs"]:
-                    self.elements.append(
-                        {
-                            "attributes": {**r},
-                            "__type": self.NodeLabels.REFERENCE.value,
-                            "__reference_id": f"{self.NodeLabels.REFERENCE.value}_{r['referenceLocator']}",
-                        }
-                    )
-                    component["references"].extend(
-                        [
-                            {
-                                "__toId": f"{self.NodeLabels.REFERENCE.value}_{r['referenceLocator']}",
-                            }
-                            for r in component["attributes"]["externalRefs"]
-                        ]
+            if "externalRefs" in c:
+                # Each reference is linked once per component, in the order listed
+                reference_ids = {}
+                for r in c["externalRefs"]:
+                    reference_id = self.node_id(
+                        self.NodeLabels.REFERENCE, r["referenceLocator"]
                     )
+                    if reference_id not in self.__reference_ids:
+                        self.__reference_ids.add(reference_id)
+                        yield SBOMRecord(
+                            self.NodeLabels.REFERENCE.value,
+                            reference_id,
+                            self.project(self.NodeLabels.REFERENCE, r),
+                        )
+                    reference_ids[reference_id] = None
                     # If the reference type is the purl, and one does not exist at the component level then promote it
-                    if r["referenceType"] == "purl" and "purl" not in component:
-                        component["attributes"]["purl"] = r["referenceLocator"]
+                    if (
+                        r["referenceType"] == "purl"
+                        and "purl" not in component.attributes
+                        and self.keeps(self.NodeLabels.COMPONENT, "purl")
+                    ):
+                        component.attributes["purl"] = r["referenceLocator"]
+                component.edges["references"] = [
+                    self.edge(reference_id) for reference_id in reference_ids
+                ]
                 self.__remove_attributes_key(component, "externalRefs")
 
             # Pull out the license fields into there own nodes
-            if "licenseDeclared" in component["attributes"]:
-                self.__write_licenses(
-                    [component["attributes"]["licenseDeclared"]],
-                    component["__component_id"],
-                )
+            if "licenseDeclared" in c:
+                self.__add_licenses([c["licenseDeclared"]], component.id)
                 self.__remove_attributes_key(component, "licenseDeclared")
-            if "licenseConcluded" in component["attributes"]:
-                self.__write_licenses(
-                    [component["attributes"]["licenseConcluded"]],
-                    component["__component_id"],
-                )
+            if "licenseConcluded" in c:
+                self.__add_licenses([c["licenseConcluded"]], component.id)
                 self.__remove_attributes_key(component, "licenseConcluded")
-            if "licenseInfoFromFiles" in component["attributes"]:
-                self.__write_licenses(
-                    [component["attributes"]["licenseInfoFromFiles"]],
-                    component["__component_id"],
-                )
+            if "licenseInfoFromFiles" in c:
+                self.__add_licenses([c["licenseInfoFromFiles"]], component.id)
                 self.__remove_attributes_key(component, "licenseInfoFromFiles")
 
-            self.elements.append(component)
+            # Relationships already indexed are carried by the package itself
+            if c["SPDXID"] in self.__edges_by_element:
+                component.edges["relationships"] = self.__edges_by_element.pop(
+                    c["SPDXID"]
+                )
+
+            yield component
+
+    def __index_relationships(self, relationships: Iterable[dict]):
+        """Groups the relationship edges of the BOM by their source element
+
+        Args:
+            relationships (Iterable[dict]): The relationships to index
+        """
+        for r in relationships:
+            if r["relationshipType"] not in self.RELATIONSHIP_FIELDS:
+                self.logger.warning(
+                    f"Unknown relationship type {r['relationshipType']}"
+                )
+                continue
+            edges = self.__edges_by_element.setdefault(r["spdxElementId"], {})
+            edges.setdefault(r["relationshipType"], []).append(
+                self.edge(
+                    f"{self.NodeLabels.COMPONENT.value}_{r['relatedSpdxElement']}"
+                )
+            )
 
-    def __write_relationships(self, relationships: list, document: object):
-        """Writes the relationships of the BOM to the graph
+    def __write_relationships(self, document: SBOMRecord, source: dict) -> SBOMRecord:
+        """Writes the relationships of the document itself to the graph
 
         Args:
-            relationships (list): The relationships to write
-            document_id (str): The document id to link the relationships to
+            document (SBOMRecord): The document to link the relationships to
+            source (dict): The document object the attributes were copied from
+
+        Returns:
+            SBOMRecord: The document
         """
         self.logger.info("Writing relationship edges")
-        document["describes"] = []
-        document["depends_on"] = []
-        document["dependency_of"] = []
-        document["described_by"] = []
-        document["contains"] = []
+        for field in self.RELATIONSHIP_FIELDS.values():
+            document.edges[field] = []
 
         # Connect the packages and the references to the documentDescribes to the Document
-        document["describes"].extend(
+        document.edges["describes"].extend(
             [
-                {
-                    "__toId": f"{self.NodeLabels.COMPONENT.value}_{r['SPDXID']}",
-                }
-                for r in document["attributes"]["packages"]
+                self.edge(f"{self.NodeLabels.COMPONENT.value}_{r['SPDXID']}")
+                for r in source["packages"]
             ]
         )
         self.__remove_attributes_key(document, "packages")
         # Add primary component link to the document
-        if "documentDescribes" in document["attributes"]:
-            document["describes"].extend(
+        if "documentDescribes" in source:
+            document.edges["describes"].extend(
                 [
-                    {
-                        "__toId": f"{self.NodeLabels.COMPONENT.value}_{d}",
-                    }
-                    for d in document["attributes"]["documentDescribes"]
+                    self.edge(f"{self.NodeLabels.COMPONENT.value}_{d}")
+                    for d in source["documentDescribes"]
                 ]
             )
 
-        for d in relationships:
-            if d["relationshipType"] == "DESCRIBES":
-                document["describes"].append(
-                    {
-                        "__toId": f"{self.NodeLabels.COMPONENT.value}_{d['relatedSpdxElement']}",
-                    }
-                )
-            elif d["relationshipType"] == "DEPENDS_ON":
-                document["depends_on"].append(
-                    {
-                        "__toId": f"{self.NodeLabels.COMPONENT.value}_{d['relatedSpdxElement']}"
-                    }
-                )
-            elif d["relationshipType"] == "DEPENDENCY_OF":
-                document["dependency_of"].append(
-                    {
-                        "__toId": f"{self.NodeLabels.COMPONENT.value}_{d['relatedSpdxElement']}"
-                    }
-                )
-            elif d["relationshipType"] == "DESCRIBED_BY":
-                document["described_by"].append(
-                    {
-                        "__toId": f"{self.NodeLabels.COMPONENT.value}_{d['relatedSpdxElement']}"
-                    }
-                )
-            elif d["relationshipType"] == "CONTAINS":
-                document["contains"].append(
-                    {
-                        "__toId": f"{self.NodeLabels.COMPONENT.value}_{d['relatedSpdxElement']}"
-                    }
-                )
-            else:
-                self.logger.warning(
-                    f"Unknown relationship type {d['relationshipType']}"
-                )
+        for relationship_type, edges in self.__edges_by_element.pop(
+            source.get("SPDXID"), {}
+        ).items():
+            document.edges[self.RELATIONSHIP_FIELDS[relationship_type]].extend(edges)
 
         return document
 
-    def __remove_attributes_key(self, entity: dict, key: str):
-        """Removes the specified key from the "attributes" key of the entity
+    def __write_element_relationships(self) -> Iterator[SBOMRecord]:
+        """Writes the relationships of the elements that were not written as
+        packages with their edges
+
+        Yields:
+            SBOMRecord: A component per source element with its edges
+        """
+        for element, edges in self.__edges_by_element.items():
+            yield SBOMRecord(
+                self.NodeLabels.COMPONENT.value,
+                self.node_id(self.NodeLabels.COMPONENT, element),
+                {},
+                {"relationships": edges},
+            )
+        self.__edges_by_element = {}
+
+    def __remove_attributes_key(self, entity: SBOMRecord, key: str):
+        """Removes the specified key from the attributes of the entity
 
         Args:
-            entity (dict): The entity to remove the key from
-            key (str): The key to remove from the "attributes" key of the entity
+            entity (SBOMRecord): The entity to remove the key from
+            key (str): The key to remove from the attributes of the entity
         """
-        if key in entity["attributes"]:
-            del entity["attributes"][key]
+        if key in entity.attributes:
+            del entity.attributes[key]
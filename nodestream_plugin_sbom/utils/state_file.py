@@ -0,0 +1,32 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+
+class StateFile:
+    """A JSON object persisted on disk between runs"""
+
+    def __init__(self, path: str) -> None:
+        """Loads the state, starting empty if the file does not exist or cannot be read
+
+        Args:
+            path (str): The path of the JSON file holding the state
+        """
+        self.path = Path(path)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Ignoring unreadable state file {self.path}: {e}")
+
+    def save(self):
+        """Writes the state to disk, replacing the previous file atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.path)
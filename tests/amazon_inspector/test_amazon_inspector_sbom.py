@@ -0,0 +1,256 @@
+import json
+import uuid
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from nodestream_plugin_sbom.amazon_inspector import AmazonInspectorSBOMExtractor
+from nodestream_plugin_sbom.amazon_inspector import amazon_inspector_sbom
+
+BUCKET = "exports"
+KEY_PREFIX = "inspector/"
+KMS_KEY_ARN = "arn:aws:kms:us-east-1:000000000000:key/test"
+RESOURCES = ("ec2/i-1.json", "ec2/i-2.json", "ecr/repo.json")
+
+
+def sbom(resource: str) -> dict:
+    """Builds the CycloneDX SBOM Inspector exports for a resource, with the
+    serial number and timestamp that change on every export"""
+    return {
+        "bomFormat": "CycloneDX",
+        "specVersion": "1.4",
+        "serialNumber": f"urn:uuid:{uuid.uuid4()}",
+        "metadata": {
+            "timestamp": str(uuid.uuid4()),
+            "component": {"type": "application", "name": resource},
+        },
+        "components": [
+            {
+                "type": "library",
+                "name": f"{resource}-library",
+                "bom-ref": f"{resource}-library",
+                "licenses": [{"license": {"id": "MIT"}}],
+            }
+        ],
+    }
+
+
+class InspectorStub:
+    """Stands in for the inspector2 client, whose SBOM export moto does not
+    implement, writing the export of the given resources to the mocked S3"""
+
+    def __init__(self, s3, resources=RESOURCES, status: str = "SUCCEEDED") -> None:
+        self.s3 = s3
+        self.resources = resources
+        self.status = status
+        self.exports = []
+
+    def create_sbom_export(self, reportFormat, s3Destination):
+        report_id = f"report-{len(self.exports) + 1}"
+        self.exports.append(report_id)
+        self.write_export(report_id)
+        return {"reportId": report_id}
+
+    def get_sbom_export(self, reportId):
+        return {"reportId": reportId, "status": self.status}
+
+    def write_export(self, report_id: str, resources=None):
+        prefix = f"{KEY_PREFIX}CYCLONEDX_1_4_outputs_{report_id}/"
+        for resource in resources or self.resources:
+            self.s3.put_object(
+                Bucket=BUCKET,
+                Key=prefix + resource,
+                Body=json.dumps(sbom(resource)).encode("utf-8"),
+            )
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=BUCKET)
+        yield s3
+
+
+@pytest.fixture
+def inspector(s3, monkeypatch) -> InspectorStub:
+    inspector = InspectorStub(s3)
+    client = boto3.client
+    monkeypatch.setattr(
+        amazon_inspector_sbom.boto3,
+        "client",
+        lambda name, **kwargs: (
+            inspector if name == "inspector2" else client(name, **kwargs)
+        ),
+    )
+    return inspector
+
+
+def create_extractor(**kwargs) -> AmazonInspectorSBOMExtractor:
+    extractor = AmazonInspectorSBOMExtractor(
+        bucketName=BUCKET, keyPrefix=KEY_PREFIX, kmsKeyArn=KMS_KEY_ARN, **kwargs
+    )
+    # Records the keys read from S3
+    extractor.fetched = []
+    read_s3_object = extractor.read_s3_object
+    download_s3_object = extractor.download_s3_object
+
+    def read(s3_client, key):
+        extractor.fetched.append(key)
+        return read_s3_object(s3_client, key)
+
+    def download(s3_client, key, directory):
+        extractor.fetched.append(key)
+        return download_s3_object(s3_client, key, directory)
+
+    extractor.read_s3_object = read
+    extractor.download_s3_object = download
+    return extractor
+
+
+async def extract(extractor: AmazonInspectorSBOMExtractor) -> list:
+    return [r async for r in extractor.extract_records()]
+
+
+def applications(records: list) -> set:
+    return {
+        r["attributes"]["name"]
+        for r in records
+        if r["__type"] == "Component" and r["attributes"]["type"] == "application"
+    }
+
+
+@pytest.mark.asyncio
+async def test_every_object_is_fetched_and_converted(inspector):
+    extractor = create_extractor(concurrency=2)
+    records = await extract(extractor)
+    assert inspector.exports == ["report-1"]
+    assert sorted(extractor.fetched) == sorted(
+        f"{KEY_PREFIX}CYCLONEDX_1_4_outputs_report-1/{r}" for r in RESOURCES
+    )
+    assert applications(records) == set(RESOURCES)
+    assert sum(r["__type"] == "Document" for r in records) == len(RESOURCES)
+
+
+@pytest.mark.asyncio
+async def test_staging_to_disk_yields_the_same_records(inspector):
+    # Without the node cache, whose records depend on the order files finish in
+    in_memory = await extract(create_extractor(dedup_cache_size=0))
+    staged = await extract(
+        create_extractor(dedup_cache_size=0, stage_to_disk=True, report_id="report-1")
+    )
+
+    def canonical(records):
+        return sorted(json.dumps(r, sort_keys=True) for r in records)
+
+    assert canonical(staged) == canonical(in_memory)
+
+
+@pytest.mark.asyncio
+async def test_report_id_resumes_the_export_without_starting_one(inspector):
+    inspector.write_export("report-0")
+    records = await extract(create_extractor(report_id="report-0"))
+    assert inspector.exports == []
+    assert applications(records) == set(RESOURCES)
+
+
+@pytest.mark.asyncio
+async def test_failed_export_yields_no_records(inspector):
+    inspector.status = "FAILED"
+    extractor = create_extractor()
+    assert await extract(extractor) == []
+    assert inspector.exports == ["report-1"]
+    assert extractor.fetched == []
+
+
+def keys(report_id: str, resources) -> list:
+    return sorted(
+        f"{KEY_PREFIX}CYCLONEDX_1_4_outputs_{report_id}/{r}" for r in resources
+    )
+
+
+async def interrupt_after_first_file(state_path):
+    """Runs the extractor until its first file has been converted, then fails"""
+    extractor = create_extractor(concurrency=1, state_path=str(state_path))
+    report = extractor.metrics.report
+
+    def interrupt():
+        report()
+        raise RuntimeError("interrupted")
+
+    extractor.metrics.report = interrupt
+    with pytest.raises(RuntimeError):
+        await extract(extractor)
+
+
+@pytest.mark.asyncio
+async def test_state_is_saved_when_a_run_fails(inspector, tmp_path):
+    state_path = tmp_path / "state.json"
+    await interrupt_after_first_file(state_path)
+    state = json.loads(state_path.read_text())
+    assert len(state) == 1
+    assert set(state) < set(RESOURCES)
+
+
+@pytest.mark.asyncio
+async def test_resume_after_partial_run_converts_the_rest(inspector, tmp_path):
+    state_path = tmp_path / "state.json"
+    await interrupt_after_first_file(state_path)
+    (done,) = json.loads(state_path.read_text())
+
+    resumed = create_extractor(state_path=str(state_path), report_id="report-1")
+    records = await extract(resumed)
+    rest = set(RESOURCES) - {done}
+    assert sorted(resumed.fetched) == keys("report-1", rest)
+    assert applications(records) == rest
+    assert set(json.loads(state_path.read_text())) == set(RESOURCES)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_objects_are_skipped_on_resume(inspector, tmp_path):
+    state_path = str(tmp_path / "state.json")
+    await extract(create_extractor(state_path=state_path))
+
+    resumed = create_extractor(state_path=state_path, report_id="report-1")
+    assert await extract(resumed) == []
+    assert resumed.fetched == []
+
+
+@pytest.mark.asyncio
+async def test_new_export_of_unchanged_content_is_not_converted(inspector, tmp_path):
+    state_path = tmp_path / "state.json"
+    await extract(create_extractor(state_path=str(state_path)))
+    etags = {r: e["etag"] for r, e in json.loads(state_path.read_text()).items()}
+
+    # Every object of a new export is downloaded, as its ETags are new, but
+    # the content without the serial number and timestamp is unchanged
+    extractor = create_extractor(state_path=str(state_path))
+    assert await extract(extractor) == []
+    assert sorted(extractor.fetched) == keys("report-2", RESOURCES)
+    state = json.loads(state_path.read_text())
+    assert all(state[r]["etag"] != etags[r] for r in RESOURCES)
+
+
+@pytest.mark.asyncio
+async def test_deleted_resources_get_tombstones(inspector, tmp_path):
+    state_path = tmp_path / "state.json"
+    await extract(create_extractor(state_path=str(state_path)))
+    deleted = RESOURCES[-1]
+    document_id = json.loads(state_path.read_text())[deleted]["document_id"]
+
+    inspector.resources = RESOURCES[:-1]
+    records = await extract(
+        create_extractor(state_path=str(state_path), emit_tombstones=True)
+    )
+    assert records == [
+        {
+            "attributes": {"deleted": True},
+            "__type": "Document",
+            "__document_id": document_id,
+        }
+    ]
+    assert set(json.loads(state_path.read_text())) == set(RESOURCES[:-1])
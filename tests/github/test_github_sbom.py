@@ -0,0 +1,159 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from nodestream_plugin_sbom.github import GithubSBOMExtractor
+from nodestream_plugin_sbom.utils import extraction_metrics
+
+REPO = "owner/repo"
+ETAG = '"etag-1"'
+
+
+def sbom(packages: list) -> dict:
+    return {
+        "spdxVersion": "SPDX-2.3",
+        "SPDXID": "SPDXRef-DOCUMENT",
+        "name": REPO,
+        "documentNamespace": "https://example.com/owner/repo",
+        "creationInfo": {"created": "2024-01-01T00:00:00Z", "creators": ["Tool: test"]},
+        "packages": packages,
+        "relationships": [],
+    }
+
+
+VALID_SBOM = sbom([{"SPDXID": "SPDXRef-package", "name": "package"}])
+# A package without an SPDXID cannot be converted
+BROKEN_SBOM = sbom([{"name": "package"}])
+
+
+class GitHubStub:
+    """Serves the SBOM of one repo, answering conditional requests with 304"""
+
+    def __init__(self, document: dict) -> None:
+        self.document = document
+        self.requests = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == ETAG:
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            content=json.dumps({"sbom": self.document}).encode("utf-8"),
+            headers={"ETag": ETAG},
+        )
+
+
+def create_extractor(stub: GitHubStub, cache_path) -> GithubSBOMExtractor:
+    extractor = GithubSBOMExtractor(repos=[REPO], cache_path=str(cache_path))
+    extractor.create_client = lambda: httpx.AsyncClient(
+        base_url="https://api.github.test", transport=httpx.MockTransport(stub.handle)
+    )
+    return extractor
+
+
+async def extract(extractor: GithubSBOMExtractor) -> list:
+    return [r async for r in extractor.extract_records()]
+
+
+@pytest.mark.asyncio
+async def test_converted_sbom_is_cached(tmp_path):
+    stub = GitHubStub(VALID_SBOM)
+    cache_path = tmp_path / "cache.json"
+
+    records = await extract(create_extractor(stub, cache_path))
+    assert {r["__type"] for r in records} == {"Document", "Component"}
+    assert REPO in json.loads(cache_path.read_text())
+
+    assert await extract(create_extractor(stub, cache_path)) == []
+    assert stub.requests[-1].headers["If-None-Match"] == ETAG
+
+
+@pytest.mark.asyncio
+async def test_failed_conversion_is_not_cached(tmp_path):
+    stub = GitHubStub(BROKEN_SBOM)
+    cache_path = tmp_path / "cache.json"
+
+    extractor = create_extractor(stub, cache_path)
+    await extract(extractor)
+    assert REPO not in json.loads(cache_path.read_text())
+
+    # The next run fetches and converts the SBOM again
+    stub.document = VALID_SBOM
+    records = await extract(create_extractor(stub, cache_path))
+    assert "If-None-Match" not in stub.requests[-1].headers
+    assert any(r["__type"] == "Component" for r in records)
+    assert REPO in json.loads(cache_path.read_text())
+
+
+class MultiRepoStub:
+    """Serves the SBOM of some repos, answers 404 for the others and holds
+    the requests of the slow ones until they are cancelled"""
+
+    def __init__(self, found=(), slow=()) -> None:
+        self.found = found
+        self.slow = slow
+        self.cancelled = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        repo = "/".join(request.url.path.split("/")[2:4])
+        if repo in self.slow:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                self.cancelled.append(repo)
+                raise
+        if repo in self.found:
+            return httpx.Response(
+                200, content=json.dumps({"sbom": VALID_SBOM}).encode("utf-8")
+            )
+        return httpx.Response(404, json={"message": "Not Found"})
+
+
+def create_multi_repo_extractor(stub: MultiRepoStub, repos: list, **kwargs):
+    extractor = GithubSBOMExtractor(repos=repos, max_retries=0, **kwargs)
+    extractor.create_client = lambda: httpx.AsyncClient(
+        base_url="https://api.github.test", transport=httpx.MockTransport(stub.handle)
+    )
+    return extractor
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_a_non_fatal_error(tmp_path, monkeypatch):
+    counted = {}
+    monkeypatch.setattr(
+        extraction_metrics.Metrics,
+        "get",
+        lambda: SimpleNamespace(
+            increment=lambda metric, value: counted.update(
+                {metric.name: counted.get(metric.name, 0) + value}
+            )
+        ),
+    )
+    cache_path = tmp_path / "cache.json"
+    stub = MultiRepoStub(found=("owner/found",))
+    extractor = create_multi_repo_extractor(
+        stub, ["owner/missing", "owner/found"], cache_path=str(cache_path)
+    )
+
+    records = await extract(extractor)
+    assert any(r["__type"] == "Component" for r in records)
+    assert counted[extraction_metrics.NON_FATAL_ERRORS.name] == 1
+    assert set(json.loads(cache_path.read_text())) == {"owner/found"}
+
+
+@pytest.mark.asyncio
+async def test_pending_requests_are_cancelled_and_awaited_when_closed():
+    stub = MultiRepoStub(found=("owner/found",), slow=("owner/slow-1", "owner/slow-2"))
+    extractor = create_multi_repo_extractor(
+        stub, ["owner/slow-1", "owner/found", "owner/slow-2"], concurrency=3
+    )
+
+    records = extractor.extract_records()
+    await records.__anext__()
+    await records.aclose()
+    assert sorted(stub.cancelled) == ["owner/slow-1", "owner/slow-2"]
+    assert asyncio.all_tasks() == {asyncio.current_task()}
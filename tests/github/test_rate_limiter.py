@@ -0,0 +1,175 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from nodestream_plugin_sbom.github import GithubSBOMExtractor, rate_limiter
+from nodestream_plugin_sbom.github.rate_limiter import RateLimitScheduler
+
+from .test_github_sbom import REPO, VALID_SBOM
+
+NOW = 1_700_000_000.0
+SECONDARY_LIMIT = {
+    "message": "You have exceeded a secondary rate limit. Please wait a few "
+    "minutes before you try again."
+}
+
+
+class FakeClock:
+    """Stands in for the clocks and sleep of the scheduler, advancing time
+    instantly and recording every sleep"""
+
+    def __init__(self) -> None:
+        self.elapsed = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def time(self) -> float:
+        return NOW + self.elapsed
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.elapsed += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(rate_limiter, "asyncio", SimpleNamespace(sleep=clock.sleep))
+    return clock
+
+
+def headers(remaining: int, reset: float, **extra) -> httpx.Headers:
+    return httpx.Headers(
+        {
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(reset)),
+            **extra,
+        }
+    )
+
+
+def response(status_code: int, body: dict = None, **headers) -> httpx.Response:
+    return httpx.Response(status_code, json=body or {}, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_spare_quota_is_not_paced(clock):
+    scheduler = RateLimitScheduler(burst=8)
+    scheduler.update(headers(4999, NOW + 3600))
+    for _ in range(1000):
+        await scheduler.acquire()
+    assert clock.sleeps == []
+    assert scheduler.remaining == 3999
+
+
+@pytest.mark.asyncio
+async def test_quota_below_reserve_is_spread_until_reset(clock):
+    scheduler = RateLimitScheduler(burst=1, reserve=100)
+    scheduler.update(headers(50, NOW + 100))
+    for _ in range(11):
+        await scheduler.acquire()
+    # The burst token, then one request every 2 seconds
+    assert clock.elapsed == pytest.approx(20.0)
+
+
+@pytest.mark.asyncio
+async def test_pacing_starts_at_the_reserve(clock):
+    scheduler = RateLimitScheduler(burst=1, reserve=10)
+    scheduler.update(headers(15, NOW + 60))
+    # Five requests bring the quota down to the reserve, the next is paced
+    # at the 15 requests per minute last reported
+    for _ in range(5):
+        await scheduler.acquire()
+    assert clock.sleeps == []
+    await scheduler.acquire()
+    assert clock.elapsed == pytest.approx(4.0)
+
+
+@pytest.mark.asyncio
+async def test_distant_reset_is_bounded_by_the_window(clock):
+    scheduler = RateLimitScheduler(burst=1, reserve=100)
+    scheduler.update(headers(36, 9999999999))
+    await scheduler.acquire()
+    await scheduler.acquire()
+    assert clock.elapsed == pytest.approx(100.0)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_quota_pauses_until_reset_in_bounded_waits(clock):
+    scheduler = RateLimitScheduler(burst=1, max_wait=60.0)
+    scheduler.update(headers(0, NOW + 600))
+    await scheduler.acquire()
+    assert clock.elapsed == pytest.approx(600.0)
+    assert max(clock.sleeps) <= 60.0
+    # The window has reset, so requests burst again until the next response
+    await scheduler.acquire()
+    assert clock.elapsed == pytest.approx(600.0)
+
+
+def test_out_of_order_responses_keep_the_lowest_count(clock):
+    scheduler = RateLimitScheduler()
+    scheduler.update(headers(90, NOW + 60))
+    scheduler.update(headers(95, NOW + 60))
+    assert scheduler.remaining == 90
+    scheduler.update(headers(5000, NOW + 3660))
+    assert scheduler.remaining == 5000
+
+
+@pytest.mark.asyncio
+async def test_backoff_is_exponential_and_capped(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    scheduler = RateLimitScheduler(base_delay=1.0, max_delay=10.0)
+    for attempt in range(6):
+        await scheduler.backoff(attempt)
+    assert clock.sleeps == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+    assert scheduler.retries == 6
+
+
+@pytest.mark.parametrize(
+    "resp,retried",
+    [
+        (response(429), True),
+        (response(502), True),
+        (response(404), False),
+        (response(403, **{"X-RateLimit-Remaining": "0"}), True),
+        (response(403, **{"Retry-After": "30"}), True),
+        (response(403, SECONDARY_LIMIT), True),
+        (response(403, {"message": "Resource not accessible"}), False),
+    ],
+)
+def test_should_retry(clock, resp, retried):
+    assert RateLimitScheduler().should_retry(resp, 0) is retried
+
+
+def test_retries_are_limited(clock):
+    assert not RateLimitScheduler(max_retries=2).should_retry(response(502), 2)
+
+
+@pytest.mark.asyncio
+async def test_secondary_limit_waits_a_minute(clock):
+    scheduler = RateLimitScheduler()
+    assert scheduler.should_retry(response(403, SECONDARY_LIMIT), 0)
+    await scheduler.acquire()
+    assert clock.elapsed >= 60.0
+
+
+@pytest.mark.asyncio
+async def test_extractor_retries_secondary_limit(clock):
+    responses = [
+        response(403, SECONDARY_LIMIT),
+        httpx.Response(200, content=json.dumps({"sbom": VALID_SBOM}).encode()),
+    ]
+    extractor = GithubSBOMExtractor(repos=[REPO])
+    extractor.create_client = lambda: httpx.AsyncClient(
+        base_url="https://api.github.test",
+        transport=httpx.MockTransport(lambda request: responses.pop(0)),
+    )
+    records = [r async for r in extractor.extract_records()]
+    assert any(r["__type"] == "Component" for r in records)
+    assert clock.elapsed >= 60.0
+    assert extractor.scheduler.retries == 1
@@ -0,0 +1,134 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from nodestream_plugin_sbom.interpreting import SBOMInterpreter
+from nodestream_plugin_sbom.sbom import SBOMExtractor
+from nodestream_plugin_sbom.utils.cyclonedx_writer import CycloneDXWriter
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+# Generated with benchmarks/generator.py: 30 components with 2 licenses, 2
+# references and 2 dependencies each, and 4 vulnerabilities
+CYCLONEDX = FIXTURES / "cyclonedx.json"
+# The graph ingested from the fixture by the writers that emitted one record
+# per license and component pair and per dependency, through the
+# interpretations of the sbom pipeline at the time
+CYCLONEDX_GRAPH = FIXTURES / "cyclonedx_graph.json"
+# Properties set by nodestream at ingest time
+INGEST_PROPERTIES = ("last_ingested_at", "last_ingested_by_", "was_ingested_by_")
+
+
+def node(n) -> tuple:
+    return n.type, json.dumps(dict(n.key_values), sort_keys=True)
+
+
+def ingested_graph(interpreter, records) -> dict:
+    """Interprets records into the nodes, with their merged properties, and
+    the relationships they ingest
+
+    Args:
+        interpreter (Interpreter): The interpreter of the pipeline
+        records (Iterable[dict]): The records yielded by an extractor
+
+    Returns:
+        dict: The sorted nodes and relationships
+    """
+    nodes = {}
+    relationships = set()
+    for record in records:
+        for context in interpreter.interpret_record(record):
+            ingest = context.desired_ingest
+            if not ingest.source_node_is_valid:
+                continue
+            properties = nodes.setdefault(node(ingest.source), {})
+            properties.update(
+                (k, v)
+                for k, v in ingest.source.properties.items()
+                if not k.startswith(INGEST_PROPERTIES)
+            )
+            for r in ingest.relationships:
+                nodes.setdefault(node(r.to_node), {})
+                ends = (node(r.from_node), node(r.to_node))
+                start, end = ends if r.outbound else ends[::-1]
+                relationships.add((*start, r.relationship.type, *end))
+    return {
+        "nodes": sorted([*n, p] for n, p in nodes.items()),
+        "relationships": sorted(list(r) for r in relationships),
+    }
+
+
+async def extract(path: Path) -> list:
+    return [r async for r in SBOMExtractor(str(path)).extract_records()]
+
+
+def test_cyclonedx_records_are_grouped_by_node():
+    with open(CYCLONEDX) as f:
+        records = list(CycloneDXWriter(json.load(f)).write_document())
+    counts = {}
+    for r in records:
+        counts[r.type] = counts.get(r.type, 0) + 1
+    # One record per node: the writers used to emit 187, with a License
+    # record per license and component pair and a record per dependency
+    assert counts == {
+        "Document": 1,
+        "Component": 31,
+        "Reference": 60,
+        "Vulnerability": 4,
+        "License": 10,
+    }
+
+
+@pytest.mark.asyncio
+async def test_cyclonedx_graph_is_unchanged_by_grouping():
+    records = await extract(CYCLONEDX)
+    with open(CYCLONEDX_GRAPH) as f:
+        expected = json.load(f)
+    assert ingested_graph(SBOMInterpreter.from_file_data(), records) == expected
+
+
+NESTED = {
+    "bomFormat": "CycloneDX",
+    "specVersion": "1.5",
+    "serialNumber": "urn:uuid:00000000-0000-0000-0000-000000000001",
+    "metadata": {"component": {"type": "application", "name": "app"}},
+    "components": [
+        {
+            "type": "application",
+            "name": "app",
+            "components": [
+                {
+                    "type": "library",
+                    "name": "inner",
+                    "components": [{"type": "library", "name": "innermost"}],
+                }
+            ],
+        }
+    ],
+}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streaming", [False, True])
+async def test_nested_components_are_contained_by_their_parent(tmp_path, streaming):
+    path = tmp_path / "nested.json"
+    path.write_text(json.dumps(NESTED))
+    records = [
+        r async for r in SBOMExtractor(str(path), streaming=streaming).extract_records()
+    ]
+    graph = ingested_graph(SBOMInterpreter.from_file_data(), records)
+    contains = {
+        (json.loads(start)["id"], json.loads(end)["id"])
+        for _, start, type, _, end in graph["relationships"]
+        if type == "CONTAINS"
+    }
+    assert contains == {
+        ("component_application_app", "component_library_inner"),
+        ("component_library_inner", "component_library_innermost"),
+    }
+    # The parent keeps none of its nested components as attributes
+    assert not any(
+        key.startswith("components")
+        for _, _, properties in graph["nodes"]
+        for key in properties
+    )
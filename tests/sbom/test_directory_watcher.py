@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import sys
+
+import pytest
+
+from nodestream_plugin_sbom.sbom.directory_watcher import DirectoryWatcher
+
+SETTLE_SECONDS = 0.2
+TIMEOUT = 10
+
+
+@pytest.fixture(params=["watchdog", "polling"])
+def backend(request, monkeypatch, caplog):
+    if request.param == "watchdog":
+        pytest.importorskip("watchdog.observers")
+        started = "Watching"
+    else:
+        # An import of None raises ImportError, so the watcher falls back to polling
+        monkeypatch.setitem(sys.modules, "watchdog.observers", None)
+        started = "Polling"
+    caplog.set_level(logging.INFO, logger="DirectoryWatcher")
+    yield request.param
+    assert any(started in r.getMessage() for r in caplog.get_records("call"))
+
+
+def create_watcher(directory) -> DirectoryWatcher:
+    return DirectoryWatcher(directory, interval=0.05, settle_seconds=SETTLE_SECONDS)
+
+
+async def next_batch(changes) -> list:
+    return await asyncio.wait_for(anext(changes), TIMEOUT)
+
+
+@pytest.mark.asyncio
+async def test_reports_files_written_before_watching_starts(tmp_path, backend):
+    (tmp_path / "present.json").write_text("{}")
+    watcher = create_watcher(tmp_path)
+    # Written while the files already present are converted
+    (tmp_path / "new.json").write_text("{}")
+    (tmp_path / "present.json").write_text('{"changed": true}')
+    (tmp_path / "notes.txt").write_text("")
+
+    changes = watcher.changes()
+    try:
+        batch = await next_batch(changes)
+    finally:
+        await changes.aclose()
+    assert batch == [tmp_path / "new.json", tmp_path / "present.json"]
+
+
+@pytest.mark.asyncio
+async def test_reports_files_written_while_watching(tmp_path, backend):
+    (tmp_path / "present.json").write_text("{}")
+    watcher = create_watcher(tmp_path)
+
+    changes = watcher.changes()
+    try:
+        batch = asyncio.ensure_future(next_batch(changes))
+        await asyncio.sleep(SETTLE_SECONDS)
+        (tmp_path / "nested").mkdir()
+        (tmp_path / "nested" / "new.json.gz").write_bytes(b"")
+        assert await batch == [tmp_path / "nested" / "new.json.gz"]
+    finally:
+        await changes.aclose()
@@ -0,0 +1,108 @@
+import json
+import os
+
+import pytest
+
+from nodestream_plugin_sbom.sbom import SBOMExtractor, sbom
+from nodestream_plugin_sbom.sbom.file_manifest import FileManifest
+
+from .test_sbom import CYCLONEDX
+
+# A component without a name cannot be converted
+BROKEN = {**CYCLONEDX, "components": [{"type": "library", "bom-ref": "a"}]}
+
+
+@pytest.fixture
+def opened(monkeypatch) -> list:
+    """Records the files hashed by the manifest or opened to be converted"""
+    opened = []
+    open_documents, digest = sbom.open_documents, FileManifest.digest
+
+    def spy_open_documents(path, *args):
+        opened.append(path.name)
+        return open_documents(path, *args)
+
+    def spy_digest(path):
+        opened.append(path.name)
+        return digest(path)
+
+    monkeypatch.setattr(sbom, "open_documents", spy_open_documents)
+    monkeypatch.setattr(FileManifest, "digest", staticmethod(spy_digest))
+    return opened
+
+
+async def extract(directory, manifest_path) -> list:
+    extractor = SBOMExtractor(str(directory), manifest_path=str(manifest_path))
+    return [r async for r in extractor.extract_records()]
+
+
+def write(path, document: dict):
+    path.write_text(json.dumps(document))
+
+
+@pytest.mark.asyncio
+async def test_second_run_yields_no_records(tmp_path):
+    directory = tmp_path / "sboms"
+    directory.mkdir()
+    write(directory / "a.json", CYCLONEDX)
+    manifest_path = tmp_path / "manifest.json"
+
+    assert await extract(directory, manifest_path) != []
+    assert await extract(directory, manifest_path) == []
+
+
+@pytest.mark.asyncio
+async def test_unchanged_files_are_not_opened(tmp_path, opened):
+    directory = tmp_path / "sboms"
+    directory.mkdir()
+    write(directory / "a.json", CYCLONEDX)
+    write(directory / "b.json", {**CYCLONEDX, "serialNumber": "urn:uuid:b"})
+    manifest_path = tmp_path / "manifest.json"
+    await extract(directory, manifest_path)
+
+    opened.clear()
+    assert await extract(directory, manifest_path) == []
+    assert opened == []
+
+    # A file that was touched is hashed, but not converted again
+    os.utime(directory / "a.json", ns=(0, 0))
+    assert await extract(directory, manifest_path) == []
+    assert opened == ["a.json"]
+
+
+@pytest.mark.asyncio
+async def test_copies_of_an_ingested_file_are_skipped(tmp_path, opened):
+    directory = tmp_path / "sboms"
+    directory.mkdir()
+    write(directory / "a.json", CYCLONEDX)
+    manifest_path = tmp_path / "manifest.json"
+    await extract(directory, manifest_path)
+
+    write(directory / "copy.json", CYCLONEDX)
+    opened.clear()
+    assert await extract(directory, manifest_path) == []
+    assert opened == ["copy.json"]
+
+
+@pytest.mark.asyncio
+async def test_failed_conversion_is_not_committed(tmp_path, opened):
+    directory = tmp_path / "sboms"
+    directory.mkdir()
+    path = directory / "a.json"
+    write(path, BROKEN)
+    manifest_path = tmp_path / "manifest.json"
+
+    await extract(directory, manifest_path)
+    assert FileManifest.key(path) not in json.loads(manifest_path.read_text())
+
+    # The unchanged file is converted again on the next run
+    opened.clear()
+    await extract(directory, manifest_path)
+    assert opened == ["a.json", "a.json"]
+
+    write(path, CYCLONEDX)
+    assert await extract(directory, manifest_path) != []
+    entry = json.loads(manifest_path.read_text())[FileManifest.key(path)]
+    assert entry["document_ids"] == [
+        "Document_urn:uuid:3e671687-395b-41f5-a30f-a58921a69b79"
+    ]
@@ -0,0 +1,96 @@
+import json
+import logging
+
+import pytest
+
+from nodestream_plugin_sbom.sbom import SBOMExtractor
+
+# The keys that identify the format come last, after the streamed arrays
+CYCLONEDX = {
+    "dependencies": [{"ref": "a", "dependsOn": ["b"]}],
+    "vulnerabilities": [{"id": "CVE-2024-0001", "affects": [{"ref": "b"}]}],
+    "components": [
+        {"type": "library", "name": "a", "bom-ref": "a"},
+        {"type": "library", "name": "b", "bom-ref": "b"},
+    ],
+    "serialNumber": "urn:uuid:3e671687-395b-41f5-a30f-a58921a69b79",
+    "specVersion": "1.5",
+    "bomFormat": "CycloneDX",
+}
+SPDX = {
+    "packages": [{"SPDXID": "SPDXRef-a", "name": "a"}],
+    "relationships": [
+        {
+            "spdxElementId": "SPDXRef-a",
+            "relationshipType": "DEPENDS_ON",
+            "relatedSpdxElement": "SPDXRef-b",
+        }
+    ],
+    "creationInfo": {"created": "2024-01-01T00:00:00Z"},
+    "name": "document",
+    "spdxVersion": "SPDX-2.3",
+}
+PACKAGE_LOCK = {
+    "name": "app",
+    "lockfileVersion": 3,
+    "packages": [{"name": "left-pad", "version": "1.3.0"}],
+    "dependencies": [{"ref": "left-pad"}],
+}
+
+
+async def extract(path, streaming: bool) -> list:
+    extractor = SBOMExtractor(str(path), streaming=streaming)
+    return [r async for r in extractor.extract_records()]
+
+
+def graph(records: list) -> set:
+    """The nodes and edges of the records, ignoring generated document ids
+    and which record of a node carries each edge"""
+    elements = set()
+    for r in records:
+        node = r["__type"]
+        if node != "Document":
+            node = (node, r[f"__{node.lower()}_id"])
+        elements.add(node)
+        for field, edges in r.items():
+            if field == "relationships":
+                edges = [(t, e) for t, group in edges.items() for e in group]
+            elif isinstance(edges, list):
+                edges = [(field, e) for e in edges]
+            else:
+                continue
+            elements.update((node, t, e["__toId"]) for t, e in edges)
+    return elements
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("document", [CYCLONEDX, SPDX], ids=["cyclonedx", "spdx"])
+async def test_streaming_matches_in_memory_when_format_key_is_last(tmp_path, document):
+    path = tmp_path / "sbom.json"
+    path.write_text(json.dumps(document))
+
+    in_memory = await extract(path, streaming=False)
+    streamed = await extract(path, streaming=True)
+    assert {"Document", "Component"} <= {r["__type"] for r in in_memory}
+    assert graph(streamed) == graph(in_memory)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streaming", [False, True])
+async def test_other_json_files_are_skipped(tmp_path, caplog, streaming):
+    path = tmp_path / "package-lock.json"
+    path.write_text(json.dumps(PACKAGE_LOCK))
+
+    assert await extract(path, streaming) == []
+    # Skipped as not being an SBOM, rather than failing to convert as one
+    assert "is not a CycloneDX or SPDX SBOM" in caplog.text
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+def test_streaming_and_workers_are_exclusive(tmp_path):
+    path = tmp_path / "sbom.json"
+    path.write_text(json.dumps(CYCLONEDX))
+    with pytest.raises(AttributeError, match="'streaming' and 'workers'"):
+        SBOMExtractor(str(path), streaming=True, workers=2)
+    # A single worker converts in this process, so streaming still applies
+    assert SBOMExtractor(str(path), streaming=True, workers=1).streaming
@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from nodestream_plugin_sbom.sbom import SBOMExtractor
+from nodestream_plugin_sbom.utils.attribute_projection import AttributeProjection
+
+CYCLONEDX = {
+    "bomFormat": "CycloneDX",
+    "specVersion": "1.5",
+    "serialNumber": "urn:uuid:3e671687-395b-41f5-a30f-a58921a69b79",
+    "components": [
+        {
+            "type": "library",
+            "name": "a",
+            "version": "1.0.0",
+            "bom-ref": "a",
+            "supplier": {"name": "ACME", "url": ["https://acme.test"]},
+            "hashes": [{"alg": "SHA-256", "content": "00"}],
+            "externalReferences": [{"type": "website", "url": "https://a.test"}],
+            "licenses": [{"license": {"id": "MIT"}}],
+        }
+    ],
+    "vulnerabilities": [
+        {
+            "id": "CVE-2024-0001",
+            "description": "A long description",
+            "ratings": [{"score": 9.8, "severity": "critical"}],
+            "affects": [{"ref": "a"}],
+        }
+    ],
+}
+SPDX = {
+    "spdxVersion": "SPDX-2.3",
+    "SPDXID": "SPDXRef-DOCUMENT",
+    "name": "document",
+    "creationInfo": {"created": "2024-01-01T00:00:00Z", "creators": ["Tool: test"]},
+    "packages": [
+        {
+            "SPDXID": "SPDXRef-a",
+            "name": "a",
+            "versionInfo": "1.0.0",
+            "supplier": "Organization: ACME",
+            "checksums": [{"algorithm": "SHA256", "checksumValue": "00"}],
+            "externalRefs": [
+                {
+                    "referenceCategory": "PACKAGE-MANAGER",
+                    "referenceType": "purl",
+                    "referenceLocator": "pkg:npm/a@1.0.0",
+                }
+            ],
+            "licenseConcluded": "MIT",
+        }
+    ],
+}
+
+
+async def extract(tmp_path, document: dict, projection: dict) -> dict:
+    """Extracts a document with a projection
+
+    Returns:
+        dict: The records of each node type
+    """
+    path = tmp_path / "sbom.json"
+    path.write_text(json.dumps(document))
+    extractor = SBOMExtractor(str(path), projection=projection)
+    records = {}
+    async for r in extractor.extract_records():
+        records.setdefault(r["__type"], []).append(r)
+    return records
+
+
+@pytest.mark.asyncio
+async def test_cyclonedx_include_keeps_nested_keys_flattened(tmp_path):
+    records = await extract(
+        tmp_path,
+        CYCLONEDX,
+        {"Component": {"include": ["name", "supplier"], "rename": {"name": "id"}}},
+    )
+    (component,) = records["Component"]
+    assert component["attributes"] == {
+        "id": "a",
+        "supplier.name": "ACME",
+        "supplier.url.0": "https://acme.test",
+    }
+    # Relationships are written regardless of the projection
+    assert component["references"] == [{"__toId": "Reference_https://a.test"}]
+    assert records["License"][0]["licensed_by"] == [{"__toId": "Component_library_a"}]
+
+
+@pytest.mark.asyncio
+async def test_cyclonedx_exclude_drops_nested_keys(tmp_path):
+    records = await extract(
+        tmp_path,
+        CYCLONEDX,
+        {
+            "Component": {"exclude": ["supplier", "hashes"]},
+            "Vulnerability": {"exclude": ["description"]},
+        },
+    )
+    (component,) = records["Component"]
+    assert not any(
+        k.startswith(("supplier", "hashes")) for k in component["attributes"]
+    )
+    assert component["attributes"]["version"] == "1.0.0"
+    (vulnerability,) = records["Vulnerability"]
+    assert "description" not in vulnerability["attributes"]
+    assert vulnerability["attributes"]["ratings.score"] == 9.8
+    assert vulnerability["affects"] == [{"__toId": "Component_library_a"}]
+
+
+@pytest.mark.asyncio
+async def test_spdx_include_keeps_nested_keys_flattened(tmp_path):
+    records = await extract(
+        tmp_path,
+        SPDX,
+        {
+            "Component": {"include": ["name", "checksums", "purl"]},
+            "Reference": {"include": ["referenceType"]},
+        },
+    )
+    (component,) = records["Component"]
+    assert component["attributes"] == {
+        "name": "a",
+        "checksums.0.algorithm": "SHA256",
+        "checksums.0.checksumValue": "00",
+        # Promoted from the purl reference, as purl is included
+        "purl": "pkg:npm/a@1.0.0",
+    }
+    assert records["Reference"][0]["attributes"] == {"referenceType": "purl"}
+    assert component["references"] == [{"__toId": "Reference_pkg:npm/a@1.0.0"}]
+
+
+@pytest.mark.asyncio
+async def test_spdx_exclude_drops_nested_keys(tmp_path):
+    records = await extract(
+        tmp_path,
+        SPDX,
+        {
+            "Component": {"exclude": ["checksums", "purl"]},
+            "Document": {"exclude": ["creationInfo"]},
+        },
+    )
+    (component,) = records["Component"]
+    assert not any(k.startswith(("checksums", "purl")) for k in component["attributes"])
+    assert component["attributes"]["supplier"] == "Organization: ACME"
+    (document,) = records["Document"]
+    assert not any(k.startswith("creationInfo") for k in document["attributes"])
+
+
+def test_unknown_node_type_is_rejected():
+    with pytest.raises(AttributeError):
+        AttributeProjection({"Package": {"include": ["name"]}})
@@ -0,0 +1,21 @@
+from nodestream_plugin_sbom.utils.json_spill import JSONSpill
+
+VALUES = [{"ref": "a", "note": "two\nlines"}, ["b", 1, None], "c", 2.5, True]
+
+
+def test_values_are_read_back_in_order():
+    with JSONSpill() as spill:
+        spill.extend(iter(VALUES[:2]))
+        spill.extend(VALUES[2:])
+        assert len(spill) == len(VALUES)
+        assert list(spill) == VALUES
+        # A spill can be read again, and extended after being read
+        spill.extend(["d"])
+        assert list(spill) == VALUES + ["d"]
+
+
+def test_close_removes_the_file():
+    spill = JSONSpill()
+    spill.extend(VALUES)
+    spill.close()
+    assert spill.file.closed
@@ -0,0 +1,38 @@
+import io
+import json
+
+import pytest
+
+from nodestream_plugin_sbom.utils.json_stream import JSONStreamReader
+
+DOCUMENT = {
+    "a": [1.5e3, 2, -0.25, 7.0, 1e-7, 123456789012345678901234567890],
+    "b": 7,
+    "c": {"score": 9.8, "exponent": 2.5e10, "flag": True, "none": None},
+    "d": -3.125e-2,
+}
+
+
+def read(text: str, chunk_size: int, stream_keys=()) -> dict:
+    reader = JSONStreamReader(io.StringIO(text), chunk_size)
+    return {
+        key: list(value) if key in stream_keys else value
+        for key, value in reader.items(stream_keys)
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 9, 11, 16])
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_numbers_cut_by_chunks_are_read_whole(chunk_size, separators):
+    # Without spaces every number is directly followed by , ] or }
+    text = json.dumps(DOCUMENT, separators=separators)
+    assert read(text, chunk_size) == DOCUMENT
+    assert read(text, chunk_size, stream_keys=["a"]) == DOCUMENT
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 9, 11])
+def test_exponent_at_chunk_boundary(chunk_size):
+    assert read('{"a": [1.5e3, 2], "b": 7}', chunk_size, ["a"]) == {
+        "a": [1500.0, 2],
+        "b": 7,
+    }
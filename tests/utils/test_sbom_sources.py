@@ -0,0 +1,113 @@
+import asyncio
+import bz2
+import gzip
+import io
+import json
+import lzma
+import sys
+import tarfile
+import zipfile
+
+import pytest
+
+from nodestream_plugin_sbom.sbom import SBOMExtractor
+from nodestream_plugin_sbom.utils.sbom_sources import decompress
+
+from ..sbom.test_sbom import CYCLONEDX, SPDX, graph
+
+DOCUMENTS = {"a": CYCLONEDX, "b": SPDX}
+MODES = {"default": {}, "streaming": {"streaming": True}, "workers": {"workers": 2}}
+
+
+def compress(data: bytes, suffix: str) -> bytes:
+    """Compresses data with the compression of a file name suffix"""
+    if suffix.endswith(("gz", "tgz")):
+        return gzip.compress(data)
+    if suffix.endswith("bz2"):
+        return bz2.compress(data)
+    if suffix.endswith("xz"):
+        return lzma.compress(data)
+    if suffix.endswith("zst"):
+        zstandard = pytest.importorskip("zstandard")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def tar(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def zip_(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def write_sources(directory, suffix: str):
+    """Writes each document to its own file with the given suffix, archives
+    holding the document next to a member that is not JSON"""
+    for name, document in DOCUMENTS.items():
+        data = json.dumps(document).encode("utf-8")
+        readme = {"README.txt": b"not an SBOM"}
+        if suffix.startswith("json"):
+            content = compress(data, suffix)
+        elif suffix == "zip":
+            # Zip members are compressed on their own
+            content = zip_({f"sboms/{name}.json.gz": gzip.compress(data), **readme})
+        else:
+            content = compress(tar({f"sboms/{name}.json": data, **readme}), suffix)
+        (directory / f"{name}.{suffix}").write_bytes(content)
+
+
+async def extract(directory, **config) -> list:
+    extractor = SBOMExtractor(str(directory), **config)
+    return [r async for r in extractor.extract_records()]
+
+
+@pytest.fixture(scope="module")
+def expected(tmp_path_factory) -> set:
+    """The graph of the documents read from plain JSON files"""
+    directory = tmp_path_factory.mktemp("plain")
+    write_sources(directory, "json")
+    return graph(asyncio.run(extract(directory)))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize(
+    "suffix",
+    [
+        "json.gz",
+        "json.bz2",
+        "json.xz",
+        "json.zst",
+        "tar",
+        "tar.gz",
+        "tgz",
+        "tar.bz2",
+        "tar.xz",
+        "tar.zst",
+        "zip",
+    ],
+)
+async def test_compressed_and_archived_documents_are_read(
+    tmp_path, expected, suffix, mode
+):
+    write_sources(tmp_path, suffix)
+    records = await extract(tmp_path, **MODES[mode])
+    assert sum(r["__type"] == "Document" for r in records) == len(DOCUMENTS)
+    assert graph(records) == expected
+
+
+def test_zst_without_zstandard_names_the_extra(monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(ImportError, match="zstd extra"):
+        decompress(io.BytesIO(b""), "sbom.json.zst")